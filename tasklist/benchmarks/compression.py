@@ -0,0 +1,72 @@
+"""Bytes on the wire and CPU cost of task-list responses, for the row and
+columnar JSON shapes, uncompressed and through each encoder used by
+CompressionMiddleware. No server or database is needed:
+
+    python benchmarks/compression.py --tasks 10000
+"""
+import json
+import random
+import time
+
+from argparse import ArgumentParser
+
+from tasklist.compression import BrotliCompressor, GzipCompressor, brotli
+from utils.utils import uuid7
+
+WORDS = ['buy', 'call', 'write', 'fix', 'review', 'diapers', 'report', 'bug', 'mom', 'taxes']
+
+
+def make_tasks(count):
+    return {
+        str(uuid7()): {
+            'description': ' '.join(random.choices(WORDS, k=4)),
+            'completed': random.random() < 0.5,
+        }
+        for _ in range(count)
+    }
+
+
+def row_shape(tasks):
+    return json.dumps(tasks).encode()
+
+
+def columnar_shape(tasks):
+    return json.dumps({
+        'uuids': list(tasks),
+        'descriptions': [task['description'] for task in tasks.values()],
+        'completed': [task['completed'] for task in tasks.values()],
+    }).encode()
+
+
+def identity(body):
+    return body
+
+
+def main():
+    parser = ArgumentParser(description='Benchmark response compression.')
+    parser.add_argument('--tasks', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    tasks = make_tasks(args.tasks)
+    encoders = {
+        'identity': identity,
+        'gzip': lambda body: GzipCompressor().finish(body),
+    }
+    if brotli is not None:
+        encoders['br'] = lambda body: BrotliCompressor().finish(body)
+
+    for shape_name, shape in (('rows', row_shape), ('columnar', columnar_shape)):
+        for encoder_name, encode in encoders.items():
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                size = len(encode(shape(tasks)))
+            cpu_ms = (time.perf_counter() - start) / args.repeat * 1000
+            print(
+                f'{shape_name:<9} {encoder_name:<9} '
+                f'{size:>10} bytes {cpu_ms:8.2f} ms/request'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Measures per-request dependency-resolution overhead of the old
+`Depends(get_config_filename)` -> `get_credentials` chain against the
+settings object loaded once at startup. No database is needed:
+
+    python benchmarks/dependency_overhead.py --requests 5000
+"""
+import json
+import os
+import tempfile
+import time
+
+from argparse import ArgumentParser
+from functools import lru_cache
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from tasklist.settings import Settings, configure, get_settings
+
+
+def build_app(config_file_name, secrets_file_name):
+    def get_config_filename():
+        return config_file_name
+
+    def get_app_secrets_filename():
+        return secrets_file_name
+
+    @lru_cache
+    def get_credentials(
+            config_file_name: str = Depends(get_config_filename),
+            secrets_file_name: str = Depends(get_app_secrets_filename),
+    ):
+        with open(config_file_name, 'r') as file:
+            config = json.load(file)
+        with open(secrets_file_name, 'r') as file:
+            secrets = json.load(file)
+        return {
+            'user': secrets['user'],
+            'password': secrets['password'],
+            'host': config['db_host'],
+            'database': config['database'],
+        }
+
+    app = FastAPI()
+
+    @app.get('/none')
+    def no_dependency():
+        return None
+
+    @app.get('/credentials')
+    def credentials_chain(credentials: dict = Depends(get_credentials)):
+        return credentials['host']
+
+    @app.get('/settings')
+    def settings_object(settings: Settings = Depends(get_settings)):
+        return settings.db_host
+
+    return app
+
+
+def main():
+    parser = ArgumentParser(description='Benchmark dependency resolution.')
+    parser.add_argument('--requests', type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        config_file_name = os.path.join(directory, 'config.json')
+        secrets_file_name = os.path.join(directory, 'secrets.json')
+        with open(config_file_name, 'w') as file:
+            json.dump({'db_host': 'localhost', 'database': 'tasklist'}, file)
+        with open(secrets_file_name, 'w') as file:
+            json.dump({'user': 'tasklist_app', 'password': 'x'}, file)
+
+        configure(config_file_name, secrets_file_name)
+        client = TestClient(build_app(config_file_name, secrets_file_name))
+
+        baseline = None
+        for path in ('/none', '/credentials', '/settings'):
+            client.get(path)
+            start = time.perf_counter()
+            for _ in range(args.requests):
+                client.get(path)
+            per_request = (time.perf_counter() - start) / args.requests * 1e6
+            if baseline is None:
+                baseline = per_request
+            print(
+                f'{path:<13} {per_request:8.1f} us/request '
+                f'({per_request - baseline:+.1f} us over no dependency)'
+            )
+
+
+if __name__ == '__main__':
+    main()
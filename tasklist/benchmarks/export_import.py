@@ -0,0 +1,81 @@
+"""Throughput of the streaming export and import in rows/sec.
+
+Imports a synthetic gzip NDJSON file of tasks without owner, exports the
+whole tasks table back and then deletes the imported rows in batches. It
+writes to the configured database, so point it at the test one:
+
+    python benchmarks/export_import.py config/config_test.json \\
+        config/db_app_secrets.json --rows 1000000
+"""
+import gzip
+import json
+import os
+import tempfile
+import time
+
+from argparse import ArgumentParser
+
+from utils.transfer import CHUNK_SIZE, RowImporter, export_rows
+from utils.utils import connect, uuid7
+
+
+def write_tasks(filename, rows):
+    uuids = []
+    with gzip.open(filename, 'wt') as file:
+        for i in range(rows):
+            uuid_ = str(uuid7())
+            uuids.append(uuid_)
+            file.write(json.dumps({
+                'uuid': uuid_,
+                'descricao': f'benchmark task {i}',
+                'owner_uuid': None,
+                'completed': i % 2 == 0,
+            }) + '\n')
+    return uuids
+
+
+def delete_tasks(conn, uuids, chunk_size):
+    with conn.cursor() as cursor:
+        for start in range(0, len(uuids), chunk_size):
+            chunk = uuids[start:start + chunk_size]
+            placeholders = ', '.join(['UUID_TO_BIN(%s)'] * len(chunk))
+            cursor.execute(f'DELETE FROM tasks WHERE uuid IN ({placeholders})', tuple(chunk))
+            conn.commit()
+
+
+def main():
+    parser = ArgumentParser(description='Benchmark table export and import.')
+    parser.add_argument('config', help='Service config file')
+    parser.add_argument('secrets', help='Service database secrets')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    conn = connect(args.config, args.secrets)
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'tasks.ndjson.gz')
+        uuids = write_tasks(filename, args.rows)
+        try:
+            start = time.perf_counter()
+            importer = RowImporter(conn, 'tasks', args.chunk_size)
+            with open(filename, 'rb') as file:
+                for data in iter(lambda: file.read(1 << 20), b''):
+                    importer.feed(data)
+            imported = importer.close()
+            seconds = time.perf_counter() - start
+            print(f'import: {imported} rows, {imported / seconds:.0f} rows/s')
+
+            start = time.perf_counter()
+            exported = sum(
+                data.count(b'\n')
+                for data in export_rows(conn, 'tasks', args.chunk_size, compress=False)
+            )
+            seconds = time.perf_counter() - start
+            print(f'export: {exported} rows, {exported / seconds:.0f} rows/s')
+        finally:
+            delete_tasks(conn, uuids, args.chunk_size)
+            conn.close()
+
+
+if __name__ == '__main__':
+    main()
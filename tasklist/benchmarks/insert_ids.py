@@ -0,0 +1,96 @@
+"""Compares insert throughput of random (uuid4) and time-ordered (uuid7)
+primary keys on a table shaped like `tasks`.
+
+Each scheme gets its own scratch table, filled in batches while the rows/sec
+of every reporting window is printed, so the slowdown caused by page splits
+shows up as the table grows. Needs the admin secrets to create the tables:
+
+    python benchmarks/insert_ids.py config/config_test.json \\
+        config/db_admin_secrets.json --rows 10000000
+"""
+import time
+import uuid
+
+from argparse import ArgumentParser
+
+from utils.utils import connect, uuid7
+
+SCHEMES = {
+    'uuid4': uuid.uuid4,
+    'uuid7': uuid7,
+}
+
+
+def run_scheme(conn, name, make_uuid, rows, batch_size, report_every):
+    table = f'bench_ids_{name}'
+    with conn.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {table}')
+        cursor.execute(
+            f'''
+            CREATE TABLE {table} (
+                uuid BINARY(16) PRIMARY KEY,
+                descricao NVARCHAR(1024),
+                owner_uuid BINARY(16),
+                completed BOOLEAN
+            )
+            '''
+        )
+    query = (
+        f'INSERT INTO {table} (uuid, descricao, owner_uuid, completed) '
+        'VALUES (UUID_TO_BIN(%s), %s, NULL, %s)'
+    )
+
+    start = window_start = time.perf_counter()
+    inserted = window_inserted = 0
+    while inserted < rows:
+        batch = [
+            (str(make_uuid()), 'benchmark task', False)
+            for _ in range(min(batch_size, rows - inserted))
+        ]
+        with conn.cursor() as cursor:
+            cursor.executemany(query, batch)
+        conn.commit()
+        inserted += len(batch)
+        window_inserted += len(batch)
+
+        if window_inserted >= report_every or inserted == rows:
+            now = time.perf_counter()
+            print(
+                f'{name}: {inserted:>10} rows, '
+                f'{window_inserted / (now - window_start):>10.0f} rows/s'
+            )
+            window_start, window_inserted = now, 0
+
+    total = time.perf_counter() - start
+    with conn.cursor() as cursor:
+        cursor.execute(f'DROP TABLE {table}')
+    return rows / total
+
+
+def main():
+    parser = ArgumentParser(description='Benchmark uuid4 vs uuid7 inserts.')
+    parser.add_argument('config', help='Service config file')
+    parser.add_argument('secrets', help='Service database admin secrets')
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--report-every', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    conn = connect(args.config, args.secrets)
+    try:
+        results = {
+            name: run_scheme(
+                conn, name, make_uuid,
+                args.rows, args.batch_size, args.report_every,
+            )
+            for name, make_uuid in SCHEMES.items()
+        }
+    finally:
+        conn.close()
+
+    for name, rate in results.items():
+        print(f'{name}: {rate:.0f} rows/s overall')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,14 @@
+DROP TABLE IF EXISTS task_counters;
+-- No foreign key to users: 0002 drops and recreates users, which a
+-- referencing table would block. delete_user removes the row instead.
+CREATE TABLE task_counters (
+    owner_uuid BINARY(16) PRIMARY KEY,
+    total INT NOT NULL DEFAULT 0,
+    completed INT NOT NULL DEFAULT 0
+);
+
+INSERT INTO task_counters (owner_uuid, total, completed)
+SELECT owner_uuid, COUNT(*), SUM(completed)
+FROM tasks
+WHERE owner_uuid IS NOT NULL
+GROUP BY owner_uuid;
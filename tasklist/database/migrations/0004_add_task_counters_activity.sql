@@ -0,0 +1,6 @@
+-- When each owner last created, changed or deleted a task, so warm-up can
+-- find recently active owners whatever version their task ids are.
+-- Rows that exist already start at the time of the migration.
+ALTER TABLE task_counters
+    ADD COLUMN active_at TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+    ADD INDEX task_counters_active_at (active_at);
@@ -0,0 +1,14 @@
+DROP TABLE IF EXISTS jobs;
+-- Background job state, shared by every worker: a job runs in the worker
+-- that started it, any worker can report on it or ask it to stop.
+CREATE TABLE jobs (
+    uuid BINARY(16) PRIMARY KEY,
+    kind VARCHAR(32) NOT NULL,
+    status VARCHAR(16) NOT NULL,
+    processed BIGINT NOT NULL DEFAULT 0,
+    error TEXT,
+    cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+    updated_at TIMESTAMP(3) NOT NULL
+        DEFAULT CURRENT_TIMESTAMP(3) ON UPDATE CURRENT_TIMESTAMP(3),
+    INDEX jobs_updated_at (updated_at)
+);
@@ -4,14 +4,24 @@ CREATE DATABASE tasklist;
 DROP DATABASE IF EXISTS tasklist_test;
 CREATE DATABASE tasklist_test;
 
+-- Local stand-ins for shards, used by config_shards_test.json.
+DROP DATABASE IF EXISTS tasklist_shard0;
+CREATE DATABASE tasklist_shard0;
+DROP DATABASE IF EXISTS tasklist_shard1;
+CREATE DATABASE tasklist_shard1;
+DROP DATABASE IF EXISTS tasklist_shard2;
+CREATE DATABASE tasklist_shard2;
+
 DROP USER IF EXISTS tasklist_admin@localhost;
 CREATE USER tasklist_admin@localhost IDENTIFIED BY "senha super dificil";
 GRANT ALL ON tasklist.* TO tasklist_admin@localhost;
 GRANT ALL ON tasklist_test.* TO tasklist_admin@localhost;
+GRANT ALL ON `tasklist\_shard%`.* TO tasklist_admin@localhost;
 
 DROP USER IF EXISTS tasklist_app@localhost;
 CREATE USER tasklist_app@localhost IDENTIFIED BY "senha impossivel";
 GRANT SELECT, INSERT, UPDATE, DELETE ON tasklist.* TO tasklist_app@localhost;
 GRANT SELECT, INSERT, UPDATE, DELETE ON tasklist_test.* TO tasklist_app@localhost;
+GRANT SELECT, INSERT, UPDATE, DELETE ON `tasklist\_shard%`.* TO tasklist_app@localhost;
 
 COMMIT
\ No newline at end of file
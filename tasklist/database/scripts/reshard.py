@@ -0,0 +1,248 @@
+# Moves owners to the shards a new shard map assigns them, while the
+# service keeps running on the old map. Cutover order:
+#
+# 1. Run with --copy-only, as often as wanted. It copies every owner that
+#    moves to its new shard without locking anything; the service keeps
+#    reading and writing the old shard.
+# 2. Run without --copy-only. Owner by owner, it locks the owner on the
+#    old shard, copies what changed since step 1 and deletes the owner
+#    there. Requests for an owner that was already moved answer 404 (reads)
+#    or fail (new tasks) from then on, because the workers still route it
+#    to the old shard.
+# 3. As soon as step 2 is done, point the config file at the new shards
+#    and send SIGHUP to every worker, so they route by the new map.
+#
+# Step 1 keeps step 2 short, and the time between 2 and 3 is the window
+# in which moved owners are unavailable. Sending SIGHUP before step 2
+# instead would make every owner that moves unavailable until it is moved.
+from argparse import ArgumentParser
+
+import mysql.connector as cnt
+
+from tasklist.database import DBSession
+from tasklist.settings import load_settings
+from tasklist.sharding import get_ring
+
+COPY_PASSES = 5
+
+
+def read_owners(conn, after_owner_uuid, batch_size):
+    with conn.cursor() as cursor:
+        cursor.execute(
+            '''
+            SELECT BIN_TO_UUID(owner_uuid), name FROM users
+            WHERE owner_uuid > UUID_TO_BIN(%s)
+            ORDER BY owner_uuid
+            LIMIT %s
+            ''',
+            (after_owner_uuid, batch_size),
+        )
+        return cursor.fetchall()
+
+
+def read_tasks(conn, owner_uuid, batch_size, lock=False):
+    # Returns {uuid: (descricao, completed)} for all of the owner's tasks.
+    tasks = {}
+    after_uuid = '00000000-0000-0000-0000-000000000000'
+    while True:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f'''
+                SELECT BIN_TO_UUID(uuid), descricao, completed FROM tasks
+                WHERE owner_uuid = UUID_TO_BIN(%s) AND uuid > UUID_TO_BIN(%s)
+                ORDER BY uuid
+                LIMIT %s
+                {'FOR UPDATE' if lock else ''}
+                ''',
+                (owner_uuid, after_uuid, batch_size),
+            )
+            rows = cursor.fetchall()
+        if not rows:
+            return tasks
+        for uuid_, description, completed in rows:
+            tasks[uuid_] = (description, completed)
+        after_uuid = rows[-1][0]
+
+
+def write_tasks(target, owner_uuid, tasks, batch_size):
+    # Upserts, so tasks changed since an earlier pass are brought up to date.
+    rows = [
+        (uuid_, description, completed, owner_uuid)
+        for uuid_, (description, completed) in tasks.items()
+    ]
+    for start in range(0, len(rows), batch_size):
+        with target.cursor() as cursor:
+            cursor.executemany(
+                '''
+                INSERT INTO tasks (uuid, descricao, completed, owner_uuid)
+                VALUES (UUID_TO_BIN(%s), %s, %s, UUID_TO_BIN(%s))
+                ON DUPLICATE KEY UPDATE
+                    descricao = VALUES(descricao), completed = VALUES(completed)
+                ''',
+                rows[start:start + batch_size],
+            )
+
+
+def delete_tasks(conn, uuids, batch_size):
+    uuids = list(uuids)
+    for start in range(0, len(uuids), batch_size):
+        batch = uuids[start:start + batch_size]
+        with conn.cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM tasks WHERE uuid IN ({})'.format(
+                    ', '.join(['UUID_TO_BIN(%s)'] * len(batch))
+                ),
+                batch,
+            )
+
+
+def rebuild_counters(target, owner_uuid):
+    with target.cursor() as cursor:
+        cursor.execute(
+            '''
+            REPLACE INTO task_counters (owner_uuid, total, completed)
+            SELECT UUID_TO_BIN(%s), COUNT(*), COALESCE(SUM(completed), 0)
+            FROM tasks WHERE owner_uuid = UUID_TO_BIN(%s)
+            ''',
+            (owner_uuid, owner_uuid),
+        )
+
+
+def copy_owner(source, target, owner_uuid, name, batch_size):
+    # Copies without locking the source, pass after pass, until a pass
+    # finds nothing that changed since the previous one or COPY_PASSES ran.
+    # The service keeps writing to the source meanwhile, so this only
+    # shrinks the work left for the locked final pass in cutover_owner.
+    with target.cursor() as cursor:
+        cursor.execute(
+            '''
+            INSERT INTO users (owner_uuid, name) VALUES (UUID_TO_BIN(%s), %s)
+            ON DUPLICATE KEY UPDATE name = VALUES(name)
+            ''',
+            (owner_uuid, name),
+        )
+    target.commit()
+    copied = {}
+    for _ in range(COPY_PASSES):
+        tasks = read_tasks(source, owner_uuid, batch_size)
+        source.commit()  # Ends the read view, the next pass sees new writes.
+        changed = {
+            uuid_: task for uuid_, task in tasks.items() if copied.get(uuid_) != task
+        }
+        if not changed and len(tasks) == len(copied):
+            break
+        write_tasks(target, owner_uuid, changed, batch_size)
+        target.commit()
+        copied = tasks
+    return copied
+
+
+def cutover_owner(source, target, owner_uuid, batch_size):
+    # Locks the owner on the source, so writes for it wait: the users row
+    # blocks new tasks (the foreign key check needs it) and the task rows
+    # block updates and deletes. Under that lock the target is made equal
+    # to the source, then the owner is deleted from the source, deleting
+    # exactly the tasks that were copied. A writer that waited on the lock
+    # finds the owner gone afterwards.
+    #
+    # If the source commit fails after the target one, the owner is left in
+    # both shards and running the move again finishes it.
+    with source.cursor() as cursor:
+        cursor.execute(
+            'SELECT name FROM users WHERE owner_uuid = UUID_TO_BIN(%s) FOR UPDATE',
+            (owner_uuid, ),
+        )
+        row = cursor.fetchone()
+    if row is None:
+        source.rollback()
+        return 0
+    tasks = read_tasks(source, owner_uuid, batch_size, lock=True)
+
+    with target.cursor() as cursor:
+        cursor.execute(
+            '''
+            INSERT INTO users (owner_uuid, name) VALUES (UUID_TO_BIN(%s), %s)
+            ON DUPLICATE KEY UPDATE name = VALUES(name)
+            ''',
+            (owner_uuid, row[0]),
+        )
+    write_tasks(target, owner_uuid, tasks, batch_size)
+    # Tasks deleted on the source since an earlier pass copied them.
+    stale = read_tasks(target, owner_uuid, batch_size).keys() - tasks.keys()
+    delete_tasks(target, stale, batch_size)
+    rebuild_counters(target, owner_uuid)
+    target.commit()
+
+    delete_tasks(source, tasks, batch_size)
+    DBSession(source).delete_user(owner_uuid)  # Commits the source.
+    return len(tasks)
+
+
+def move_owner(source, target, owner_uuid, name, batch_size, copy_only=False):
+    copy_owner(source, target, owner_uuid, name, batch_size)
+    if copy_only:
+        return 0
+    return cutover_owner(source, target, owner_uuid, batch_size)
+
+
+def reshard(old_settings, new_settings, batch_size, dry_run=False, copy_only=False):
+    old_credentials = old_settings.shard_credentials
+    new_credentials = new_settings.shard_credentials
+    new_ring = get_ring(new_settings)
+    targets = {}
+
+    for source_name, credentials in old_credentials.items():
+        source = cnt.connect(**credentials)
+        after_owner_uuid = '00000000-0000-0000-0000-000000000000'
+        moved = {}
+        try:
+            while True:
+                owners = read_owners(source, after_owner_uuid, batch_size)
+                if not owners:
+                    break
+                after_owner_uuid = owners[-1][0]
+                for owner_uuid, name in owners:
+                    target_name = new_ring.shard_for(owner_uuid)
+                    if new_credentials.get(target_name) == credentials:
+                        continue
+                    moved[target_name] = moved.get(target_name, 0) + 1
+                    if dry_run:
+                        continue
+                    if target_name not in targets:
+                        targets[target_name] = cnt.connect(**new_credentials[target_name])
+                    move_owner(
+                        source, targets[target_name], owner_uuid, name, batch_size, copy_only,
+                    )
+        finally:
+            source.close()
+        for target_name, count in sorted(moved.items()):
+            print(f'{source_name} -> {target_name}: {count} owners')
+
+    for target in targets.values():
+        target.close()
+
+
+def main():
+    parser = ArgumentParser(description='Move owners to the shards a new shard map assigns them.')
+    parser.add_argument('old_config', help='Service config file with the current shards')
+    parser.add_argument('new_config', help='Service config file with the new shards')
+    parser.add_argument('secrets', help='Service database secrets')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--dry-run', action='store_true', help='Only report what would move')
+    parser.add_argument(
+        '--copy-only', action='store_true',
+        help='Copy owners to their new shards without moving them yet',
+    )
+
+    args = parser.parse_args()
+    reshard(
+        load_settings(args.old_config, args.secrets),
+        load_settings(args.new_config, args.secrets),
+        args.batch_size,
+        args.dry_run,
+        args.copy_only,
+    )
+
+
+if __name__ == '__main__':
+    main()
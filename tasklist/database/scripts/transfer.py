@@ -0,0 +1,48 @@
+from argparse import ArgumentParser
+
+from tasklist.database import open_session
+from tasklist.settings import load_settings
+from utils.transfer import CHUNK_SIZE, TABLES
+
+READ_SIZE = 1 << 20
+
+
+def export_table(db, table, filename, chunk_size, compress):
+    # A sharded session reads every shard into the one file.
+    with open(filename, 'wb') as file:
+        for data in db.export_table(table, chunk_size, compress):
+            file.write(data)
+
+
+def import_table(db, table, filename, chunk_size, compressed):
+    # A sharded session sends each row to the shard of its owner.
+    importer = db.table_importer(table, chunk_size, compressed)
+    with open(filename, 'rb') as file:
+        for data in iter(lambda: file.read(READ_SIZE), b''):
+            importer.feed(data)
+    return importer.close()
+
+
+def main():
+    parser = ArgumentParser(description='Export or import a table as NDJSON.')
+    parser.add_argument('command', choices=['export', 'import'])
+    parser.add_argument('table', choices=sorted(TABLES))
+    parser.add_argument('file', help='NDJSON file, gzip-compressed if it ends in .gz')
+    parser.add_argument('config', help='Service config file')
+    parser.add_argument('secrets', help='Service database secrets')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    args = parser.parse_args()
+    compressed = args.file.endswith('.gz')
+    with open_session(load_settings(args.config, args.secrets)) as db:
+        if args.command == 'export':
+            export_table(db, args.table, args.file, args.chunk_size, compressed)
+        else:
+            imported = import_table(db, args.table, args.file, args.chunk_size, compressed)
+            print(f'Imported {imported} rows into {args.table}.')
+            if args.table == 'tasks':
+                print('Task counters are now stale: POST /job/reconcile-counters.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+# pylint: disable=missing-module-docstring, missing-function-docstring, missing-class-docstring
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+
+class GzipCompressor:
+    encoding = 'gzip'
+
+    def __init__(self, level: int = 6):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        # Sync-flush so every streamed chunk can be decoded as it arrives.
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b'') -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+class BrotliCompressor:
+    encoding = 'br'
+
+    def __init__(self, quality: int = 4):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self, data: bytes = b'') -> bytes:
+        return self._compressor.process(data) + self._compressor.finish()
+
+
+def header_qualities(value: str):
+    # Parses an Accept-style header into {lowercased item: q}.
+    qualities = {}
+    for item in value.split(','):
+        name, *params = [part.strip() for part in item.split(';')]
+        if not name:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, param_value = param.partition('=')
+            if key.strip() == 'q':
+                try:
+                    quality = float(param_value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.lower()] = quality
+    return qualities
+
+
+def accepted_encodings(accept_encoding: str):
+    return {
+        name for name, quality in header_qualities(accept_encoding).items() if quality > 0
+    }
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _compressor(self, scope):
+        encodings = accepted_encodings(Headers(scope=scope).get('accept-encoding', ''))
+        if brotli is not None and 'br' in encodings:
+            return BrotliCompressor(self.brotli_quality)
+        if 'gzip' in encodings:
+            return GzipCompressor(self.gzip_level)
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        compressor = self._compressor(scope)
+        if compressor is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressionResponder(self.app, compressor, self.minimum_size)(scope, receive, send)
+
+
+class _CompressionResponder:
+    def __init__(self, app, compressor, minimum_size: int):
+        self.app = app
+        self.compressor = compressor
+        self.minimum_size = minimum_size
+        self.send = None
+        self.start_message = None
+        self.passthrough = False
+        self.compressing = False
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message):
+        if message['type'] == 'http.response.start':
+            # Held back until the first body chunk tells us whether the
+            # response is worth compressing.
+            self.start_message = message
+            self.passthrough = 'content-encoding' in Headers(raw=message['headers'])
+            return
+
+        if message['type'] != 'http.response.body':
+            await self.send(message)
+            return
+
+        body = message.get('body', b'')
+        more_body = message.get('more_body', False)
+
+        if self.start_message is not None:
+            start_message, self.start_message = self.start_message, None
+            if self.passthrough or (not more_body and len(body) < self.minimum_size):
+                self.passthrough = True
+                await self.send(start_message)
+            else:
+                self.compressing = True
+                headers = MutableHeaders(raw=start_message['headers'])
+                headers['Content-Encoding'] = self.compressor.encoding
+                headers.add_vary_header('Accept-Encoding')
+                if more_body:
+                    del headers['Content-Length']
+                else:
+                    body = self.compressor.finish(body)
+                    headers['Content-Length'] = str(len(body))
+                    await self.send(start_message)
+                    await self.send({'type': 'http.response.body', 'body': body})
+                    return
+                await self.send(start_message)
+
+        if not self.compressing:
+            await self.send(message)
+            return
+
+        if more_body:
+            body = self.compressor.compress(body)
+        else:
+            body = self.compressor.finish(body)
+        await self.send({'type': 'http.response.body', 'body': body, 'more_body': more_body})
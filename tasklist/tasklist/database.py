@@ -1,21 +1,50 @@
 # pylint: disable=missing-module-docstring, missing-function-docstring, missing-class-docstring
-import json
+import threading
 import uuid
 
-from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import chain
 
 import mysql.connector as conn
 
+from mysql.connector import pooling
+
 from fastapi import Depends
 
-from utils.utils import get_config_filename, get_app_secrets_filename
+from utils.transfer import RowImporter, export_rows, gzip_chunks
+from utils.utils import uuid7
+
+from .loader import DataLoader
+from .models import JobStatus, Task, TaskStats, User
+from .settings import Settings, current_settings, get_settings
+from .sharding import get_ring
+
+POOL_SIZE = 8
+FINISHED_JOB_STATUSES = ('done', 'cancelled', 'failed')
+BATCH_GET_CHUNK = 500
+TRUNCATE_LOCK_WAIT_SECONDS = 2
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+_fan_out_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='shard')
+
 
-from .models import Task, User
+def _chunks(items, size):
+    items = list(dict.fromkeys(str(item) for item in items))
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _placeholders(count):
+    return ', '.join(['UUID_TO_BIN(%s)'] * count)
 
 
 class DBSession:
     def __init__(self, connection: conn.MySQLConnection):
         self.connection = connection
+
     def read_all_tasks(self):
         query = 'SELECT BIN_TO_UUID(uuid), descricao, completed FROM tasks'
 
@@ -32,38 +61,57 @@ class DBSession:
         }
     def read_tasks(self, completed: bool = None, owner_uuid: str = None):
         query = 'SELECT BIN_TO_UUID(uuid), descricao, completed FROM tasks'
+        conditions = []
+        params = ()
         if completed is not None:
-            query += ' WHERE completed = '
-            if completed:
-                query += 'True'
-            else:
-                query += 'False'
-        if completed is not None and owner_uuid is not "":
-            query += " AND "
-
+            conditions.append('completed = %s')
+            params += (completed, )
         if owner_uuid is not None:
-            query += " WHERE owner_uuid = UUID_TO_BIN(%s)"
+            conditions.append('owner_uuid = UUID_TO_BIN(%s)')
+            params += (str(owner_uuid), )
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
 
         with self.connection.cursor() as cursor:
-            cursor.execute(query, str(owner_uuid))
+            cursor.execute(query, params)
             db_results = cursor.fetchall()
 
         return {
             uuid_: Task(
-                descricao=field_description,
+                description=field_description,
                 completed=bool(field_completed),
             )
             for uuid_, field_description, field_completed in db_results
         }
 
+    def read_recent_owners(self, limit: int):
+        # Every task write stamps its owner's counters row, so this is a
+        # short backwards scan of the active_at index. Task ids cannot be
+        # used: old uuid4 ids sort above the time-ordered ones.
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                '''
+                SELECT BIN_TO_UUID(owner_uuid) FROM task_counters
+                ORDER BY active_at DESC
+                LIMIT %s
+                ''',
+                (limit, ),
+            )
+            db_results = cursor.fetchall()
+
+        return [owner_uuid for owner_uuid, in db_results]
+
     def create_task(self, item: Task):
-        uuid_ = uuid.uuid4()
+        uuid_ = uuid7()
+
+        owner_uuid = None if item.owner_uuid is None else str(item.owner_uuid)
 
         with self.connection.cursor() as cursor:
             cursor.execute(
-                'INSERT INTO tasks (uuid, descricao, completed, owner_uuid) VALUES (UUID_TO_BIN(%s), %s, %s, %s)',
-                (str(uuid_), item.description, str(item.completed), str(item.owner_uuid)),
+                'INSERT INTO tasks (uuid, descricao, completed, owner_uuid) VALUES (UUID_TO_BIN(%s), %s, %s, UUID_TO_BIN(%s))',
+                (str(uuid_), item.description, item.completed, owner_uuid),
             )
+            self.__bump_counters(cursor, owner_uuid, 1, int(item.completed))
         self.connection.commit()
         return uuid_
 
@@ -82,13 +130,39 @@ class DBSession:
             )
             result = cursor.fetchone()
 
-        return Task(descricao=result[0], completed=bool(result[1]))
+        if result is None:
+            raise KeyError()
+        return Task(description=result[0], completed=bool(result[1]))
+
+    def read_tasks_for_owners(self, owner_uuids):
+        tasks = {}
+        for chunk in _chunks(owner_uuids, BATCH_GET_CHUNK):
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    f'''
+                    SELECT BIN_TO_UUID(owner_uuid), BIN_TO_UUID(uuid), descricao, completed
+                    FROM tasks
+                    WHERE owner_uuid IN ({_placeholders(len(chunk))})
+                    ''',
+                    tuple(chunk),
+                )
+                db_results = cursor.fetchall()
+
+            tasks.update({owner_uuid: {} for owner_uuid in chunk})
+            for owner_uuid, uuid_, field_description, field_completed in db_results:
+                tasks[owner_uuid][uuid_] = Task(
+                    description=field_description,
+                    completed=bool(field_completed),
+                )
+
+        return tasks
 
     def replace_task(self, uuid_, item: Task, owner_uuid):
         if not self.__task_exists(uuid_):
             raise KeyError()
 
         with self.connection.cursor() as cursor:
+            old_completed = self.__lock_task(cursor, uuid_, owner_uuid)
             cursor.execute(
                 '''
                 UPDATE tasks SET descricao=%s, completed=%s
@@ -96,6 +170,10 @@ class DBSession:
                 ''',
                 (item.description, item.completed, str(uuid_), str(owner_uuid)),
             )
+            if old_completed is not None:
+                self.__bump_counters(
+                    cursor, owner_uuid, 0, int(item.completed) - old_completed,
+                )
         self.connection.commit()
 
     def remove_task(self, uuid_, owner_uuid):
@@ -103,17 +181,170 @@ class DBSession:
             raise KeyError()
 
         with self.connection.cursor() as cursor:
+            old_completed = self.__lock_task(cursor, uuid_, owner_uuid)
             cursor.execute(
                 'DELETE FROM tasks WHERE uuid=UUID_TO_BIN(%s) AND owner_uuid=UUID_TO_BIN(%s)',
                 (str(uuid_), str(owner_uuid)),
             )
+            if old_completed is not None:
+                self.__bump_counters(cursor, owner_uuid, -1, -old_completed)
         self.connection.commit()
 
-    def remove_all_tasks(self):
+    def truncate_tasks(self, lock_wait_timeout: int = TRUNCATE_LOCK_WAIT_SECONDS):
+        # TRUNCATE drops and recreates the table instead of deleting row by
+        # row, so it neither holds row locks nor fills the undo log. It needs
+        # an exclusive metadata lock, though: it waits for every open
+        # transaction on tasks (an export, a purge chunk, a long read) and
+        # new queries on tasks queue up behind it, so it only gets
+        # lock_wait_timeout seconds. It also needs the DROP privilege, which
+        # the app user may not have. In both cases the caller falls back to
+        # a chunked purge.
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute('SET SESSION lock_wait_timeout = %s', (lock_wait_timeout, ))
+                try:
+                    cursor.execute('TRUNCATE TABLE tasks')
+                finally:
+                    cursor.execute('SET SESSION lock_wait_timeout = DEFAULT')
+                # A plain DELETE: a second TRUNCATE could time out after the
+                # first one succeeded and leave counters for deleted tasks.
+                cursor.execute('DELETE FROM task_counters')
+            self.connection.commit()
+        except conn.Error:
+            return False
+        return True
+
+    def purge_tasks_chunk(self, owner_uuid=None, batch_size: int = 10000, after_uuid=None):
+        # Deletes the next batch of tasks, in primary key order after
+        # after_uuid, and returns their uuids. Starting after the last batch
+        # instead of at the head of the key keeps each batch from stepping
+        # over rows the previous ones deleted but were not purged yet.
+        # The tasks are taken off their owners' counters in the same
+        # transaction, so the counters stay right wherever a purge stops:
+        # done, cancelled or failed.
+        if after_uuid is None:
+            after_uuid = uuid.UUID(int=0)
+        query = '''
+            SELECT BIN_TO_UUID(uuid), BIN_TO_UUID(owner_uuid), completed FROM tasks
+            WHERE uuid > UUID_TO_BIN(%s)
+        '''
+        params = (str(after_uuid), )
+        if owner_uuid is not None:
+            query += ' AND owner_uuid=UUID_TO_BIN(%s)'
+            params += (str(owner_uuid), )
+        query += ' ORDER BY uuid LIMIT %s FOR UPDATE'
+        params += (batch_size, )
+
         with self.connection.cursor() as cursor:
-            cursor.execute('DELETE FROM tasks')
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+            if rows:
+                cursor.execute(
+                    f'DELETE FROM tasks WHERE uuid IN ({_placeholders(len(rows))})',
+                    [uuid_ for uuid_, _, _ in rows],
+                )
+                changes = {}
+                for _, task_owner_uuid, completed in rows:
+                    if task_owner_uuid is None:
+                        continue
+                    total, completed_total = changes.get(task_owner_uuid, (0, 0))
+                    changes[task_owner_uuid] = (total - 1, completed_total - int(bool(completed)))
+                if changes:
+                    self.__bump_many_counters(
+                        cursor,
+                        [(owner, total, completed) for owner, (total, completed) in changes.items()],
+                    )
         self.connection.commit()
 
+        return [uuid_ for uuid_, _, _ in rows]
+
+    def reconcile_counters_chunk(self, after_owner_uuid=None, batch_size: int = 10000):
+        # Rebuilds the counters of the next batch of users, in primary key
+        # order, from the tasks table. Returns the owners it went through.
+        if after_owner_uuid is None:
+            after_owner_uuid = uuid.UUID(int=0)
+
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                '''
+                SELECT BIN_TO_UUID(owner_uuid) FROM users
+                WHERE owner_uuid > UUID_TO_BIN(%s)
+                ORDER BY owner_uuid
+                LIMIT %s
+                ''',
+                (str(after_owner_uuid), batch_size),
+            )
+            owners = [owner_uuid for owner_uuid, in cursor.fetchall()]
+            if owners:
+                cursor.execute(
+                    '''
+                    INSERT INTO task_counters (owner_uuid, total, completed)
+                    SELECT users.owner_uuid, COUNT(tasks.uuid), COALESCE(SUM(tasks.completed), 0)
+                    FROM users LEFT JOIN tasks ON tasks.owner_uuid = users.owner_uuid
+                    WHERE users.owner_uuid BETWEEN UUID_TO_BIN(%s) AND UUID_TO_BIN(%s)
+                    GROUP BY users.owner_uuid
+                    ON DUPLICATE KEY UPDATE
+                        total = VALUES(total), completed = VALUES(completed)
+                    ''',
+                    (owners[0], owners[-1]),
+                )
+        self.connection.commit()
+
+        return owners
+
+    def read_stats(self, owner_uuid):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                '''
+                SELECT task_counters.total, task_counters.completed
+                FROM users LEFT JOIN task_counters
+                    ON task_counters.owner_uuid = users.owner_uuid
+                WHERE users.owner_uuid = UUID_TO_BIN(%s)
+                ''',
+                (str(owner_uuid), ),
+            )
+            result = cursor.fetchone()
+
+        if result is None:
+            raise KeyError()
+        total, completed = (int(value or 0) for value in result)
+        return TaskStats(total=total, completed=completed, open=total - completed)
+
+    def __lock_task(self, cursor, uuid_, owner_uuid):
+        # Returns the current completed flag, locking the row until commit so
+        # the counter delta matches what the update replaces.
+        cursor.execute(
+            '''
+            SELECT completed FROM tasks
+            WHERE uuid=UUID_TO_BIN(%s) AND owner_uuid=UUID_TO_BIN(%s)
+            FOR UPDATE
+            ''',
+            (str(uuid_), str(owner_uuid)),
+        )
+        result = cursor.fetchone()
+        return None if result is None else int(result[0])
+
+    @staticmethod
+    def __bump_counters(cursor, owner_uuid, total: int, completed: int):
+        if owner_uuid is None:
+            return
+        DBSession.__bump_many_counters(cursor, [(owner_uuid, total, completed)])
+
+    @staticmethod
+    def __bump_many_counters(cursor, changes):
+        # Adds (owner_uuid, total, completed) deltas to the owners' counters.
+        cursor.executemany(
+            '''
+            INSERT INTO task_counters (owner_uuid, total, completed)
+            VALUES (UUID_TO_BIN(%s), %s, %s)
+            ON DUPLICATE KEY UPDATE
+                total = total + VALUES(total),
+                completed = completed + VALUES(completed),
+                active_at = CURRENT_TIMESTAMP(3)
+            ''',
+            [(str(owner_uuid), total, completed) for owner_uuid, total, completed in changes],
+        )
+
     def __task_exists(self, uuid_: uuid.UUID):
         with self.connection.cursor() as cursor:
             cursor.execute(
@@ -129,8 +360,9 @@ class DBSession:
 
         return found
 
-    def create_user(self, item: User):
-        uuid_ = uuid.uuid4()
+    def create_user(self, item: User, uuid_: uuid.UUID = None):
+        if uuid_ is None:
+            uuid_ = uuid7()
 
         with self.connection.cursor() as cursor:
             cursor.execute(
@@ -145,17 +377,50 @@ class DBSession:
         with self.connection.cursor() as cursor:
             cursor.execute(
                 'DELETE FROM users WHERE owner_uuid=UUID_TO_BIN(%s)',
-                (str(owner_uuid)),
+                (str(owner_uuid), ),
+            )
+            cursor.execute(
+                'DELETE FROM task_counters WHERE owner_uuid=UUID_TO_BIN(%s)',
+                (str(owner_uuid), ),
             )
         self.connection.commit()
 
         return 200
 
+    def delete_purged_user(self, owner_uuid):
+        # Last step of purging a user. The users row is locked first: a new
+        # task for the user needs that row for its foreign key check, so it
+        # waits, and nothing can be added between deleting the tasks the
+        # purge chunks missed and deleting the user. No task is left behind
+        # with its owner set to NULL. Returns how many tasks it deleted.
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT owner_uuid FROM users WHERE owner_uuid=UUID_TO_BIN(%s) FOR UPDATE',
+                (str(owner_uuid), ),
+            )
+            cursor.fetchall()
+            cursor.execute(
+                'DELETE FROM tasks WHERE owner_uuid=UUID_TO_BIN(%s)',
+                (str(owner_uuid), ),
+            )
+            deleted = cursor.rowcount
+            cursor.execute(
+                'DELETE FROM users WHERE owner_uuid=UUID_TO_BIN(%s)',
+                (str(owner_uuid), ),
+            )
+            cursor.execute(
+                'DELETE FROM task_counters WHERE owner_uuid=UUID_TO_BIN(%s)',
+                (str(owner_uuid), ),
+            )
+        self.connection.commit()
+
+        return deleted
+
     def update_user(self, item: User, owner_uuid):
         with self.connection.cursor() as cursor:
             cursor.execute(
                 'UPDATE users SET name=%s WHERE owner_uuid=UUID_TO_BIN(%s)',
-                (name, str(owner_uuid)),
+                (item.name, str(owner_uuid)),
             )
         self.connection.commit()
 
@@ -165,34 +430,337 @@ class DBSession:
         with self.connection.cursor() as cursor:
             cursor.execute(
                 'SELECT name FROM users WHERE owner_uuid=UUID_TO_BIN(%s)',
-                (str(owner_uuid)),
+                (str(owner_uuid), ),
             )
-        self.connection.commit()
-        result = cursor.fetchone()
+            result = cursor.fetchone()
 
+        if result is None:
+            raise KeyError()
         return User(name=result[0])
 
+    def read_users(self, owner_uuids):
+        users = {}
+        for chunk in _chunks(owner_uuids, BATCH_GET_CHUNK):
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    f'''
+                    SELECT BIN_TO_UUID(owner_uuid), name FROM users
+                    WHERE owner_uuid IN ({_placeholders(len(chunk))})
+                    ''',
+                    tuple(chunk),
+                )
+                db_results = cursor.fetchall()
+
+            users.update({
+                owner_uuid: User(name=field_name)
+                for owner_uuid, field_name in db_results
+            })
+
+        return users
 
-@lru_cache
-def get_credentials(
-        config_file_name: str = Depends(get_config_filename),
-        secrets_file_name: str = Depends(get_app_secrets_filename),
-):
-    with open(config_file_name, 'r') as file:
-        config = json.load(file)
-    with open(secrets_file_name, 'r') as file:
-        secrets = json.load(file)
-    return {
-        'user': secrets['user'],
-        'password': secrets['password'],
-        'host': config['db_host'],
-        'database': config['database'],
-    }
-
-
-def get_db(credentials: dict = Depends(get_credentials)):
+    def create_job(self, job: JobStatus, keep_finished: int):
+        # Also forgets all but the keep_finished most recent finished jobs.
+        statuses = ', '.join(['%s'] * len(FINISHED_JOB_STATUSES))
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'''
+                DELETE FROM jobs
+                WHERE status IN ({statuses}) AND updated_at < (
+                    SELECT updated_at FROM (
+                        SELECT updated_at FROM jobs
+                        WHERE status IN ({statuses})
+                        ORDER BY updated_at DESC
+                        LIMIT 1 OFFSET %s
+                    ) AS oldest_kept
+                )
+                ''',
+                (*FINISHED_JOB_STATUSES, *FINISHED_JOB_STATUSES, keep_finished),
+            )
+            cursor.execute(
+                '''
+                INSERT INTO jobs (uuid, kind, status, processed, error)
+                VALUES (UUID_TO_BIN(%s), %s, %s, %s, %s)
+                ''',
+                (job.uuid, job.kind, job.status, job.processed, job.error),
+            )
+        self.connection.commit()
+
+    def update_job(self, job: JobStatus) -> bool:
+        # Saves the job's progress and answers whether it was asked to stop.
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                '''
+                UPDATE jobs SET status=%s, processed=%s, error=%s
+                WHERE uuid=UUID_TO_BIN(%s)
+                ''',
+                (job.status, job.processed, job.error, job.uuid),
+            )
+            cursor.execute(
+                'SELECT cancel_requested FROM jobs WHERE uuid=UUID_TO_BIN(%s)',
+                (job.uuid, ),
+            )
+            result = cursor.fetchone()
+        self.connection.commit()
+
+        return result is not None and bool(result[0])
+
+    def read_job(self, job_uuid) -> JobStatus:
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                '''
+                SELECT BIN_TO_UUID(uuid), kind, status, processed, error FROM jobs
+                WHERE uuid=UUID_TO_BIN(%s)
+                ''',
+                (str(job_uuid), ),
+            )
+            result = cursor.fetchone()
+        self.connection.commit()
+        if result is None:
+            raise KeyError()
+
+        uuid_, kind, status, processed, error = result
+        return JobStatus(uuid=uuid_, kind=kind, status=status, processed=processed, error=error)
+
+    def cancel_job(self, job_uuid) -> JobStatus:
+        statuses = ', '.join(['%s'] * len(FINISHED_JOB_STATUSES))
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'''
+                UPDATE jobs SET cancel_requested=TRUE
+                WHERE uuid=UUID_TO_BIN(%s) AND status NOT IN ({statuses})
+                ''',
+                (str(job_uuid), *FINISHED_JOB_STATUSES),
+            )
+        self.connection.commit()
+
+        return self.read_job(job_uuid)
+
+    def export_table(self, table: str, chunk_size: int, compress: bool = True):
+        return export_rows(self.connection, table, chunk_size, compress)
+
+    def table_importer(self, table: str, batch_size: int, compressed: bool = True):
+        return RowImporter(self.connection, table, batch_size, compressed)
+
+
+class _ShardedRowImporter(RowImporter):
+    def __init__(self, session, table: str, batch_size: int, compressed: bool):
+        super().__init__(None, table, batch_size, compressed)
+        self.session = session
+        self.importers = {}
+
+    def add_row(self, row: dict):
+        # Users and tasks both carry owner_uuid, which picks the shard.
+        name = self.session.ring.shard_for(row.get('owner_uuid'))
+        importer = self.importers.get(name)
+        if importer is None:
+            importer = RowImporter(
+                self.session.shard(name).connection, self.table, self.batch_size, False,
+            )
+            self.importers[name] = importer
+        # Kept current so a failed import can report what was committed.
+        before = importer.imported
+        importer.add_row(row)
+        self.imported += importer.imported - before
+
+    def close(self):
+        super().close()
+        self.imported = sum(importer.close() for importer in self.importers.values())
+        return self.imported
+
+
+class ShardedDBSession:
+    # Same interface as DBSession over several databases. A user and all of
+    # its tasks live in the shard its owner_uuid hashes to: owner-scoped
+    # calls go there, the others run on every shard concurrently and merge
+    # the results. Shard connections are opened on first use.
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.ring = get_ring(settings)
+        self._sessions = {}
+
+    def shard(self, name: str) -> DBSession:
+        session = self._sessions.get(name)
+        if session is None:
+            credentials = self.settings.shard_credentials[name]
+            session = DBSession(get_connection(credentials, self.settings.pool_size))
+            self._sessions[name] = session
+        return session
+
+    def for_owner(self, owner_uuid) -> DBSession:
+        return self.shard(self.ring.shard_for(owner_uuid))
+
+    def close(self):
+        for session in self._sessions.values():
+            session.connection.close()
+
+    def _fan_out(self, method: str, *args):
+        sessions = [self.shard(name) for name in self.settings.shard_credentials]
+        futures = [
+            _fan_out_executor.submit(getattr(session, method), *args)
+            for session in sessions
+        ]
+        return [future.result() for future in futures]
+
+    def _fan_out_by_owner(self, method: str, owner_uuids):
+        groups = {}
+        for owner_uuid in owner_uuids:
+            groups.setdefault(self.ring.shard_for(owner_uuid), []).append(owner_uuid)
+        sessions = {name: self.shard(name) for name in groups}
+        futures = [
+            _fan_out_executor.submit(getattr(sessions[name], method), owners)
+            for name, owners in groups.items()
+        ]
+        results = {}
+        for future in futures:
+            results.update(future.result())
+        return results
+
+    @staticmethod
+    def _merge(results):
+        merged = {}
+        for result in results:
+            merged.update(result)
+        return merged
+
+    def read_all_tasks(self):
+        return self._merge(self._fan_out('read_all_tasks'))
+
+    def read_tasks(self, completed: bool = None, owner_uuid: str = None):
+        if owner_uuid is None:
+            return self._merge(self._fan_out('read_tasks', completed, None))
+        return self.for_owner(owner_uuid).read_tasks(completed, owner_uuid)
+
+    def read_recent_owners(self, limit: int):
+        return list(chain.from_iterable(self._fan_out('read_recent_owners', limit)))
+
+    def create_task(self, item: Task):
+        return self.for_owner(item.owner_uuid).create_task(item)
+
+    def read_task(self, uuid_: uuid.UUID, owner_uuid):
+        return self.for_owner(owner_uuid).read_task(uuid_, owner_uuid)
+
+    def read_tasks_for_owners(self, owner_uuids):
+        return self._fan_out_by_owner('read_tasks_for_owners', owner_uuids)
+
+    def replace_task(self, uuid_, item: Task, owner_uuid):
+        return self.for_owner(owner_uuid).replace_task(uuid_, item, owner_uuid)
+
+    def remove_task(self, uuid_, owner_uuid):
+        return self.for_owner(owner_uuid).remove_task(uuid_, owner_uuid)
+
+    def truncate_tasks(self):
+        return all(self._fan_out('truncate_tasks'))
+
+    def purge_tasks_chunk(self, owner_uuid=None, batch_size: int = 10000, after_uuid=None):
+        if owner_uuid is not None:
+            return self.for_owner(owner_uuid).purge_tasks_chunk(owner_uuid, batch_size, after_uuid)
+        return list(chain.from_iterable(
+            self._fan_out('purge_tasks_chunk', None, batch_size, after_uuid)
+        ))
+
+    def read_stats(self, owner_uuid):
+        return self.for_owner(owner_uuid).read_stats(owner_uuid)
+
+    def create_user(self, item: User):
+        uuid_ = uuid7()
+        return self.for_owner(uuid_).create_user(item, uuid_)
+
+    def delete_user(self, owner_uuid):
+        return self.for_owner(owner_uuid).delete_user(owner_uuid)
+
+    def delete_purged_user(self, owner_uuid):
+        return self.for_owner(owner_uuid).delete_purged_user(owner_uuid)
+
+    def update_user(self, item: User, owner_uuid):
+        return self.for_owner(owner_uuid).update_user(item, owner_uuid)
+
+    def read_user(self, owner_uuid):
+        return self.for_owner(owner_uuid).read_user(owner_uuid)
+
+    def read_users(self, owner_uuids):
+        return self._fan_out_by_owner('read_users', owner_uuids)
+
+    def export_table(self, table: str, chunk_size: int, compress: bool = True):
+        # Shards are read one after the other into a single stream.
+        chunks = chain.from_iterable(
+            self.shard(name).export_table(table, chunk_size, False)
+            for name in self.settings.shard_credentials
+        )
+        return gzip_chunks(chunks) if compress else chunks
+
+    def table_importer(self, table: str, batch_size: int, compressed: bool = True):
+        return _ShardedRowImporter(self, table, batch_size, compressed)
+
+
+def get_pool(credentials: dict, pool_size: int = POOL_SIZE):
+    # The pool opens all of its connections when created, so creating it at
+    # startup keeps connect latency out of the first requests.
+    key = tuple(sorted(credentials.items()))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = pooling.MySQLConnectionPool(pool_size=pool_size, **credentials)
+            _pools[key] = pool
+    return pool
+
+
+def warm_up(credentials: dict, pool_size: int = POOL_SIZE, recent_owners: int = 0):
+    connection = get_pool(credentials, pool_size).get_connection()
+    try:
+        db = DBSession(connection)
+        # Run the hot query shapes once so the server has the table
+        # definitions open, and pull the pages of recently active owners
+        # into the buffer pool.
+        db.read_tasks(completed=False, owner_uuid=uuid.UUID(int=0))
+        for owner_uuid in db.read_recent_owners(recent_owners) if recent_owners else []:
+            db.read_tasks(owner_uuid=owner_uuid)
+    finally:
+        connection.close()
+
+
+def get_connection(credentials: dict, pool_size: int = POOL_SIZE):
+    try:
+        return get_pool(credentials, pool_size).get_connection()
+    except conn.errors.PoolError:
+        # Every pooled connection is in use: do not make the request wait.
+        return conn.connect(**credentials)
+
+
+@contextmanager
+def open_session(settings: Settings):
+    if settings.shards:
+        db = ShardedDBSession(settings)
+        try:
+            yield db
+        finally:
+            db.close()
+        return
+
+    connection = get_connection(settings.credentials, settings.pool_size)
     try:
-        connection = conn.connect(**credentials)
         yield DBSession(connection)
     finally:
         connection.close()
+
+
+def get_db(settings: Settings = Depends(get_settings)):
+    with open_session(settings) as db:
+        yield db
+
+
+def read_in_session(settings: Settings, method: str, *args):
+    # Runs one DBSession read on a connection of its own. Reads shared
+    # through SingleFlight use it, so that requests waiting for another
+    # one's result do not hold a connection meanwhile.
+    with open_session(settings) as db:
+        return getattr(db, method)(*args)
+
+
+def _load_users(owner_uuids):
+    return read_in_session(current_settings(), 'read_users', owner_uuids)
+
+
+# Shared by every request of the worker: users looked up by concurrent
+# requests in the same event-loop tick are read with one query, on a
+# pooled connection of its own.
+user_loader = DataLoader(_load_users)
@@ -0,0 +1,193 @@
+# pylint: disable=missing-module-docstring, missing-function-docstring, missing-class-docstring
+import abc
+import logging
+import threading
+import uuid
+
+from contextlib import contextmanager
+from typing import Optional
+
+import mysql.connector as conn
+
+from .database import DBSession, FINISHED_JOB_STATUSES, get_connection
+from .models import JobStatus
+from .settings import Settings
+from .sharding import get_ring
+
+BATCH_SIZE = 10000
+MAX_FINISHED_JOBS = 100
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def _jobs_db(settings: Settings):
+    # Job state lives in the base database, also when the data is sharded,
+    # so that every worker sees the same jobs.
+    connection = get_connection(settings.credentials, settings.pool_size)
+    try:
+        yield DBSession(connection)
+    finally:
+        connection.close()
+
+
+class Job(abc.ABC):
+    kind = 'job'
+
+    def __init__(self, settings: Settings, batch_size: int = BATCH_SIZE):
+        self.uuid = str(uuid.uuid4())
+        self.settings = settings
+        self.batch_size = batch_size
+        self.status = 'pending'
+        self.processed = 0
+        self.error = None
+        self._cancelled = threading.Event()
+
+    def shards(self):
+        # Names of the shards to run on, one after the other.
+        return list(self.settings.shard_credentials)
+
+    def begin(self, db: DBSession):
+        pass
+
+    @abc.abstractmethod
+    def step(self, db: DBSession) -> int:
+        # Processes one batch and returns how many rows it touched. The job
+        # ends when a batch comes back smaller than batch_size.
+        ...
+
+    def finish(self, db: DBSession):
+        pass
+
+    def run(self):
+        # Runs in the worker that started the job. Progress is saved after
+        # every batch, which is also when a cancel asked for through any
+        # worker is noticed. A job whose worker died stays 'running'.
+        self.status = 'running'
+        shard_credentials = self.settings.shard_credentials
+        try:
+            self._save()
+            for name in self.shards():
+                if not self._run_shard(shard_credentials[name]):
+                    self.status = 'cancelled'
+                    return
+            self.status = 'done'
+        except Exception as exception:  # pylint: disable=broad-except
+            # Nobody awaits a background job: whatever went wrong, record
+            # it, or the job would stay running forever.
+            logger.exception('Job %s (%s) failed', self.uuid, self.kind)
+            self.status = 'failed'
+            self.error = str(exception)
+        finally:
+            try:
+                self._save()
+            except conn.Error:
+                logger.exception('Could not save the final status of job %s', self.uuid)
+
+    def _run_shard(self, credentials: dict):
+        connection = conn.connect(**credentials)
+        try:
+            db = DBSession(connection)
+            self.begin(db)
+            while not self._cancelled.is_set():
+                processed = self.step(db)
+                self.processed += processed
+                self._save()
+                if processed < self.batch_size:
+                    break
+            if self._cancelled.is_set():
+                return False
+            self.finish(db)
+            return True
+        finally:
+            connection.close()
+
+    def _save(self):
+        with _jobs_db(self.settings) as db:
+            if db.update_job(self.as_status()):
+                self._cancelled.set()
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_JOB_STATUSES
+
+    def as_status(self):
+        return JobStatus(
+            uuid=self.uuid,
+            kind=self.kind,
+            status=self.status,
+            processed=self.processed,
+            error=self.error,
+        )
+
+
+class PurgeJob(Job):
+    kind = 'purge'
+
+    def __init__(self, settings: Settings, owner_uuid=None, batch_size: int = BATCH_SIZE):
+        super().__init__(settings, batch_size)
+        self.owner_uuid = owner_uuid
+        # Tasks are deleted in primary key order; each shard starts over.
+        self.last_uuid = None
+
+    def shards(self):
+        if self.owner_uuid is None:
+            return super().shards()
+        return [get_ring(self.settings).shard_for(self.owner_uuid)]
+
+    def begin(self, db: DBSession):
+        self.last_uuid = None
+
+    def step(self, db: DBSession) -> int:
+        deleted = db.purge_tasks_chunk(self.owner_uuid, self.batch_size, self.last_uuid)
+        if deleted:
+            self.last_uuid = deleted[-1]
+        return len(deleted)
+
+    def finish(self, db: DBSession):
+        # The user goes away only together with its last tasks, otherwise
+        # the foreign key would turn tasks created meanwhile into orphans.
+        # Counters need nothing here: every chunk already took its tasks
+        # off them, and the user's row goes with the user.
+        if self.owner_uuid is not None:
+            self.processed += db.delete_purged_user(self.owner_uuid)
+
+
+class ReconcileCountersJob(Job):
+    kind = 'reconcile-counters'
+
+    def __init__(self, settings: Settings, batch_size: int = BATCH_SIZE):
+        super().__init__(settings, batch_size)
+        self.last_owner_uuid = None
+
+    def begin(self, db: DBSession):
+        self.last_owner_uuid = None
+
+    def step(self, db: DBSession) -> int:
+        owners = db.reconcile_counters_chunk(self.last_owner_uuid, self.batch_size)
+        if owners:
+            self.last_owner_uuid = owners[-1]
+        return len(owners)
+
+
+def register_job(job: Job):
+    with _jobs_db(job.settings) as db:
+        db.create_job(job.as_status(), MAX_FINISHED_JOBS)
+    return job
+
+
+def get_job(settings: Settings, job_uuid) -> Optional[JobStatus]:
+    with _jobs_db(settings) as db:
+        try:
+            return db.read_job(job_uuid)
+        except KeyError:
+            return None
+
+
+def request_cancel(settings: Settings, job_uuid) -> Optional[JobStatus]:
+    # The job stops after its current batch, in whichever worker runs it.
+    with _jobs_db(settings) as db:
+        try:
+            return db.cancel_job(job_uuid)
+        except KeyError:
+            return None
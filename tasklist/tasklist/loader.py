@@ -0,0 +1,58 @@
+# pylint: disable=missing-module-docstring, missing-function-docstring, missing-class-docstring
+import asyncio
+
+from typing import Callable, Dict, Iterable, List, Set
+
+from starlette.concurrency import run_in_threadpool
+
+
+class DataLoader:
+    # Collects the keys asked for during one event-loop tick, by any number
+    # of requests, and resolves them with a single call to batch_load,
+    # which takes a list of keys and returns a dict. batch_load blocks, so
+    # it runs in the thread pool. Keys missing from that dict raise
+    # KeyError. Several loads of the same key share one future.
+    def __init__(self, batch_load: Callable[[List[str]], Dict[str, object]]):
+        self.batch_load = batch_load
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._batches: Set[asyncio.Task] = set()
+
+    async def load(self, key):
+        return await self._future(key)
+
+    async def load_many(self, keys: Iterable):
+        return await asyncio.gather(*[self._future(key) for key in keys])
+
+    def _future(self, key):
+        key = str(key)
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_event_loop()
+            if not self._pending:
+                loop.call_soon(self._dispatch)
+            future = loop.create_future()
+            self._pending[key] = future
+        return future
+
+    def _dispatch(self):
+        pending, self._pending = self._pending, {}
+        batch = asyncio.ensure_future(self._resolve(pending))
+        # The loop only keeps weak references to tasks.
+        self._batches.add(batch)
+        batch.add_done_callback(self._batches.discard)
+
+    async def _resolve(self, pending: Dict[str, asyncio.Future]):
+        try:
+            results = await run_in_threadpool(self.batch_load, list(pending))
+        except Exception as exception:  # pylint: disable=broad-except
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(exception)
+            return
+        for key, future in pending.items():
+            if future.done():  # The load was cancelled.
+                continue
+            if key in results:
+                future.set_result(results[key])
+            else:
+                future.set_exception(KeyError(key))
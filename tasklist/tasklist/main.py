@@ -1,7 +1,26 @@
 # pylint: disable=missing-module-docstring
+import time
+
+IMPORT_STARTED = time.perf_counter()
+
+# pylint: disable=wrong-import-position
+import asyncio
+import logging
+
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+
+from .compression import CompressionMiddleware
+from .database import warm_up
+from .routers import admin, health, job, task, user
+from .settings import current_settings, install_reload_handler
+
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
+WARM_UP_RETRY_SECONDS = 5
 
-from .routers import task, user
+logger = logging.getLogger(__name__)
 
 tags_metadata = [
     {
@@ -12,13 +31,84 @@ tags_metadata = [
         'name': 'user',
         'description': 'Operations related to users.',
     },
+    {
+        'name': 'job',
+        'description': 'Background maintenance jobs.',
+    },
+    {
+        'name': 'admin',
+        'description': 'Bulk export and import.',
+    },
+    {
+        'name': 'health',
+        'description': 'Service readiness.',
+    },
 ]
 
+
+def warm_up_shards():
+    settings = current_settings()
+    for credentials in settings.shard_credentials.values():
+        warm_up(
+            credentials,
+            pool_size=settings.pool_size,
+            recent_owners=settings.warmup_recent_owners,
+        )
+    return settings
+
+
+async def warm_up_until_ready(app_: FastAPI):
+    # Runs beside the server, which answers /health/ready with 503 in the
+    # meantime. A database that cannot be reached yet, e.g. while scaling
+    # up, is retried instead of keeping the worker from starting.
+    started = time.perf_counter()
+    while True:
+        try:
+            settings = await run_in_threadpool(warm_up_shards)
+            break
+        except Exception:  # pylint: disable=broad-except
+            logger.exception('Warm-up failed, retrying in %ss', WARM_UP_RETRY_SECONDS)
+            await asyncio.sleep(WARM_UP_RETRY_SECONDS)
+
+    timings = app_.state.boot_timings
+    timings['warm_up_seconds'] = time.perf_counter() - started
+    timings['boot_seconds'] = timings['import_seconds'] + timings['warm_up_seconds']
+    budget = settings.boot_budget_seconds
+    if budget is not None and timings['boot_seconds'] > budget:
+        logger.warning(
+            'Boot took %.2fs, over the %.2fs budget', timings['boot_seconds'], budget,
+        )
+    app_.state.ready = True
+
+
+@asynccontextmanager
+async def lifespan(app_: FastAPI):
+    install_reload_handler()
+    warming_up = asyncio.ensure_future(warm_up_until_ready(app_))
+    try:
+        yield
+    finally:
+        warming_up.cancel()
+        try:
+            await warming_up
+        except asyncio.CancelledError:
+            pass
+
+
 app = FastAPI(
     title='Task list',
     description='Task-list project for the **Megadados** course',
     openapi_tags=tags_metadata,
+    lifespan=lifespan,
 )
 
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+app.state.ready = False
+app.state.boot_timings = {'import_seconds': IMPORT_SECONDS}
+
 app.include_router(task.router, prefix='/task', tags=['task'])
 app.include_router(user.router, prefix='/user', tags=['user'])
+app.include_router(job.router, prefix='/job', tags=['job'])
+app.include_router(admin.router, prefix='/admin', tags=['admin'])
+app.include_router(health.router, prefix='/health', tags=['health'])
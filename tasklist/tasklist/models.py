@@ -1,14 +1,12 @@
 # pylint: disable=missing-module-docstring,missing-class-docstring
+import uuid
+
 from typing import Optional
 
 from pydantic import BaseModel, Field  # pylint: disable=no-name-in-module
 
-from uuid import uuid4
-
 # pylint: disable=too-few-public-methods
 
-owner_uuid_str = str(uuid4)
-
 class Task(BaseModel):
     description: Optional[str] = Field(
         'no description',
@@ -19,10 +17,9 @@ class Task(BaseModel):
         False,
         title='Shows whether the task was completed',
     )
-    owner_uuid: Optional[str] = Field(
+    owner_uuid: Optional[uuid.UUID] = Field(
         None,
         title="Owner UUID",
-        max_length=32,
     )
 
     class Config:
@@ -40,10 +37,9 @@ class User(BaseModel):
         title='user name',
         max_length=1024,
     )
-    owner_uuid: Optional[str] = Field(
+    owner_uuid: Optional[uuid.UUID] = Field(
         None,
         title="Owner UUID",
-        max_length=32,
     )
 
     class Config:
@@ -52,4 +48,72 @@ class User(BaseModel):
                 'name': 'Jua1mmmmmmm',
                 "owner_uuid": '1b57f7a1-22df-4cb4-b6b6-3356e1cd0be7'
             }
-        }
\ No newline at end of file
+        }
+
+class TaskStats(BaseModel):
+    total: int = Field(
+        0,
+        title='Number of tasks',
+    )
+    completed: int = Field(
+        0,
+        title='Number of completed tasks',
+    )
+    open: int = Field(
+        0,
+        title='Number of tasks still open',
+    )
+
+    class Config:
+        schema_extra = {
+            'example': {
+                'total': 12,
+                'completed': 5,
+                'open': 7,
+            }
+        }
+
+
+class JobStatus(BaseModel):
+    uuid: str = Field(
+        ...,
+        title='Job UUID',
+    )
+    kind: str = Field(
+        ...,
+        title='What the job does',
+    )
+    status: str = Field(
+        ...,
+        title='One of pending, running, done, cancelled or failed',
+    )
+    processed: int = Field(
+        0,
+        title='Rows processed so far',
+    )
+    error: Optional[str] = Field(
+        None,
+        title='Error message when the job failed',
+    )
+
+    class Config:
+        schema_extra = {
+            'example': {
+                'uuid': '0c2a3e4c-5d6e-4f70-8a9b-0c1d2e3f4a5b',
+                'kind': 'purge',
+                'status': 'running',
+                'processed': 120000,
+                'error': None,
+            }
+        }
+
+
+class ImportResult(BaseModel):
+    imported: int = Field(
+        0,
+        title='Rows imported',
+    )
+    job: Optional[JobStatus] = Field(
+        None,
+        title='Counter reconciliation started after importing tasks',
+    )
@@ -0,0 +1,100 @@
+# pylint: disable=missing-module-docstring, missing-function-docstring, invalid-name
+import zlib
+
+import mysql.connector as conn
+
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from utils.transfer import CHUNK_SIZE, TABLES
+
+from ..database import DBSession, get_db, open_session
+from ..jobs import ReconcileCountersJob, register_job
+from ..models import ImportResult
+from ..settings import Settings, get_settings
+
+router = APIRouter()
+
+
+def check_table(table: str):
+    if table not in TABLES:
+        raise HTTPException(
+            status_code=404,
+            detail='Table not found',
+        )
+
+
+def export_chunks(settings: Settings, table: str, chunk_size: int, compress: bool):
+    # The body streams after the route has returned, and on older FastAPI
+    # releases after its dependencies were closed: the session has to
+    # live as long as the generator, not the request.
+    with open_session(settings) as db:
+        yield from db.export_table(table, chunk_size, compress)
+
+
+@router.get(
+    '/export/{table}',
+    summary='Exports a table',
+    description=(
+        'Streams the users or tasks table as NDJSON, one row per line, '
+        'gzip-encoded unless compress is false.'
+    ),
+)
+async def export_table(
+        table: str,
+        compress: bool = True,
+        chunk_size: int = CHUNK_SIZE,
+        settings: Settings = Depends(get_settings),
+):
+    check_table(table)
+    headers = {'Content-Disposition': f'attachment; filename="{table}.ndjson"'}
+    if compress:
+        headers['Content-Encoding'] = 'gzip'
+    return StreamingResponse(
+        export_chunks(settings, table, chunk_size, compress),
+        media_type='application/x-ndjson',
+        headers=headers,
+    )
+
+
+@router.post(
+    '/import/{table}',
+    summary='Imports a table',
+    description=(
+        'Inserts the NDJSON rows of the request body, as produced by the '
+        'export, in batches. Send Content-Encoding: gzip for a compressed '
+        'body. Import users before their tasks. Importing tasks starts a '
+        'counter reconciliation job. A malformed row or a rejected insert '
+        'stops the import with 400; the batches committed before it stay, '
+        'and detail.imported counts their rows.'
+    ),
+    response_model=ImportResult,
+)
+async def import_table(
+        table: str,
+        request: Request,
+        background_tasks: BackgroundTasks,
+        batch_size: int = CHUNK_SIZE,
+        db: DBSession = Depends(get_db),
+        settings: Settings = Depends(get_settings),
+):
+    check_table(table)
+    compressed = request.headers.get('content-encoding', '').lower() == 'gzip'
+    importer = db.table_importer(table, batch_size, compressed)
+    # Decoding and inserting block, so they run in the thread pool.
+    try:
+        async for data in request.stream():
+            await run_in_threadpool(importer.feed, data)
+        result = ImportResult(imported=await run_in_threadpool(importer.close))
+    except (ValueError, zlib.error, conn.Error) as exception:
+        raise HTTPException(
+            status_code=400,
+            detail={'error': str(exception), 'imported': importer.imported},
+        ) from exception
+
+    if table == 'tasks':
+        job = await run_in_threadpool(register_job, ReconcileCountersJob(settings))
+        background_tasks.add_task(job.run)
+        result.job = job.as_status()
+    return result
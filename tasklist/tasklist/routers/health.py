@@ -0,0 +1,40 @@
+# pylint: disable=missing-module-docstring, missing-function-docstring, invalid-name
+from typing import Dict
+
+from fastapi import APIRouter, HTTPException, Request
+
+from ..singleflight import reads
+
+router = APIRouter()
+
+
+@router.get(
+    '/ready',
+    summary='Reports readiness',
+    description=(
+        'Answers 200 with the boot timings once the connection pool is open '
+        'and caches are warm, 503 before that.'
+    ),
+    response_model=Dict[str, float],
+)
+async def ready(request: Request):
+    if not request.app.state.ready:
+        raise HTTPException(
+            status_code=503,
+            detail='Warming up',
+        )
+    return request.app.state.boot_timings
+
+
+@router.get(
+    '/singleflight',
+    summary='Reports read coalescing',
+    description=(
+        'Counts, since the worker started, the reads executed, the ones that '
+        'shared an in-flight read instead, and the ones that ran alone '
+        'because too many were waiting or the shared read timed out.'
+    ),
+    response_model=Dict[str, int],
+)
+async def singleflight_metrics():
+    return reads.metrics
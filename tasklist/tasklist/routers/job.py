@@ -0,0 +1,65 @@
+# pylint: disable=missing-module-docstring, missing-function-docstring, invalid-name
+import uuid
+
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
+
+from ..jobs import ReconcileCountersJob, get_job, register_job, request_cancel
+from ..models import JobStatus
+from ..settings import Settings, get_settings
+
+router = APIRouter()
+
+
+@router.post(
+    '/reconcile-counters',
+    summary='Rebuilds task counters',
+    description=(
+        'Starts a background job that rebuilds the per-user task counters '
+        'from the tasks table, one batch of users at a time.'
+    ),
+    response_model=JobStatus,
+)
+async def reconcile_counters(
+        background_tasks: BackgroundTasks,
+        batch_size: int = 1000,
+        settings: Settings = Depends(get_settings),
+):
+    job = await run_in_threadpool(register_job, ReconcileCountersJob(settings, batch_size))
+    background_tasks.add_task(job.run)
+    return job.as_status()
+
+
+@router.get(
+    '/{job_uuid}',
+    summary='Reads job status',
+    description='Reads the status and progress of a background job.',
+    response_model=JobStatus,
+)
+async def read_job(job_uuid: uuid.UUID, settings: Settings = Depends(get_settings)):
+    job = await run_in_threadpool(get_job, settings, job_uuid)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail='Job not found',
+        )
+    return job
+
+
+@router.delete(
+    '/{job_uuid}',
+    summary='Cancels job',
+    description=(
+        'Asks a background job to stop after its current batch, whichever '
+        'worker runs it.'
+    ),
+    response_model=JobStatus,
+)
+async def cancel_job(job_uuid: uuid.UUID, settings: Settings = Depends(get_settings)):
+    job = await run_in_threadpool(request_cancel, settings, job_uuid)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail='Job not found',
+        )
+    return job
@@ -1,33 +1,120 @@
 # pylint: disable=missing-module-docstring, missing-function-docstring, invalid-name
 import uuid
 
-from typing import Dict
+from typing import Dict, List, Optional
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Header, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
 
-from ..database import DBSession, get_db
-from ..models import Task
+from ..compression import header_qualities
+from ..database import DBSession, get_db, read_in_session
+from ..jobs import PurgeJob, register_job
+from ..models import JobStatus, Task
+from ..settings import Settings, get_settings
+from ..singleflight import reads
 
 router = APIRouter()
 
+COLUMNAR_MEDIA_TYPE = 'application/vnd.tasklist.columnar+json'
+
+task_list_responses = {
+    200: {
+        'content': {
+            COLUMNAR_MEDIA_TYPE: {
+                'example': {
+                    'uuids': ['1b57f7a1-22df-4cb4-b6b6-3356e1cd0be7'],
+                    'descriptions': ['Buy baby diapers'],
+                    'completed': [False],
+                },
+            },
+        },
+    },
+}
+
+
+def wants_columnar(accept: Optional[str]):
+    # Columnar only when asked for explicitly, and not ranked below plain
+    # JSON; q=0 refuses it.
+    if accept is None:
+        return False
+    qualities = header_qualities(accept)
+    columnar = qualities.get(COLUMNAR_MEDIA_TYPE, 0.0)
+    plain = max(
+        qualities.get(media_type, 0.0)
+        for media_type in ('application/json', 'application/*', '*/*')
+    )
+    return columnar > 0 and columnar >= plain
+
+
+def tasks_response(tasks: Dict[str, Task], accept: Optional[str], response: Response):
+    # Lists of tasks repeat the same keys on every row; the columnar shape
+    # sends each key once. Clients opt in through the Accept header, so
+    # caches must keep the two shapes apart.
+    if not wants_columnar(accept):
+        response.headers['Vary'] = 'Accept'
+        return tasks
+    return JSONResponse(
+        {
+            'uuids': list(tasks),
+            'descriptions': [task.description for task in tasks.values()],
+            'completed': [task.completed for task in tasks.values()],
+        },
+        media_type=COLUMNAR_MEDIA_TYPE,
+        headers={'Vary': 'Accept'},
+    )
+
+
 @router.get(
     '',
     summary='read all tasks',
-    description='Read all tasks.',
+    description=f'Read all tasks. Accepts {COLUMNAR_MEDIA_TYPE} for a columnar response.',
     response_model=Dict[uuid.UUID, Task],
+    responses=task_list_responses,
 )
-async def read_all_tasks(db: DBSession = Depends(get_db)):
-    return db.read_all_tasks()
+async def read_all_tasks(
+        response: Response,
+        accept: Optional[str] = Header(None),
+        settings: Settings = Depends(get_settings),
+):
+    tasks = await reads.do(('read_all_tasks', ), read_in_session, settings, 'read_all_tasks')
+    return tasks_response(tasks, accept, response)
 
 
 @router.get(
     '/user/{owner_uuid}',
     summary='Reads task list',
-    description='Reads the whole task list.',
+    description=(
+        'Reads the whole task list. '
+        f'Accepts {COLUMNAR_MEDIA_TYPE} for a columnar response.'
+    ),
     response_model=Dict[uuid.UUID, Task],
+    responses=task_list_responses,
 )
-async def read_tasks(completed: bool = None, owner_uuid = uuid.UUID, db: DBSession = Depends(get_db)):
-    return db.read_tasks(completed, owner_uuid)
+async def read_tasks(
+        response: Response,
+        owner_uuid: uuid.UUID,
+        completed: bool = None,
+        accept: Optional[str] = Header(None),
+        settings: Settings = Depends(get_settings),
+):
+    # Identical concurrent reads, e.g. right after a popular list changed,
+    # share a single query and a single connection.
+    tasks = await reads.do(
+        ('read_tasks', completed, str(owner_uuid)),
+        read_in_session, settings, 'read_tasks', completed, owner_uuid,
+    )
+    return tasks_response(tasks, accept, response)
+
+
+@router.post(
+    '/batch-get',
+    summary='Reads the task lists of many users',
+    description='Reads the task lists of the users whose UUIDs are given, in a few queries.',
+    response_model=Dict[uuid.UUID, Dict[uuid.UUID, Task]],
+)
+async def read_tasks_for_owners(owner_uuids: List[uuid.UUID], db: DBSession = Depends(get_db)):
+    return db.read_tasks_for_owners(owner_uuids)
 
 
 @router.post(
@@ -46,7 +133,7 @@ async def create_task(item: Task, db: DBSession = Depends(get_db)):
     description='Reads task from UUID.',
     response_model=Task,
 )
-async def read_task(uuid_: uuid.UUID, owner_uuid = uuid.UUID, db: DBSession = Depends(get_db)):
+async def read_task(uuid_: uuid.UUID, owner_uuid: uuid.UUID, db: DBSession = Depends(get_db)):
     try:
         return db.read_task(uuid_, owner_uuid)
     except KeyError as exception:
@@ -57,17 +144,18 @@ async def read_task(uuid_: uuid.UUID, owner_uuid = uuid.UUID, db: DBSession = De
 
 
 @router.put(
-    '/{uuid_}',
+    '/{uuid_}/user/{owner_uuid}',
     summary='Replaces a task',
     description='Replaces a task identified by its UUID.',
 )
 async def replace_task(
         uuid_: uuid.UUID,
+        owner_uuid: uuid.UUID,
         item: Task,
         db: DBSession = Depends(get_db),
 ):
     try:
-        db.replace_task(uuid_, item)
+        db.replace_task(uuid_, item, owner_uuid)
     except KeyError as exception:
         raise HTTPException(
             status_code=404,
@@ -116,7 +204,24 @@ async def remove_task(uuid_: uuid.UUID, owner_uuid: uuid.UUID, db: DBSession = D
 @router.delete(
     '/delete/all',
     summary='Deletes all tasks, use with caution',
-    description='Deletes all tasks, use with caution',
+    description=(
+        'Deletes all tasks, use with caution. Truncates the table when '
+        'possible, otherwise (no privilege, or other transactions hold the '
+        'table for more than a couple of seconds) starts a background job '
+        'that deletes them in batches and returns its status.'
+    ),
+    response_model=Optional[JobStatus],
 )
-async def remove_all_tasks(db: DBSession = Depends(get_db)):
-    db.remove_all_tasks()
\ No newline at end of file
+async def remove_all_tasks(
+        background_tasks: BackgroundTasks,
+        truncate: bool = True,
+        batch_size: int = 10000,
+        db: DBSession = Depends(get_db),
+        settings: Settings = Depends(get_settings),
+):
+    # TRUNCATE can wait on a metadata lock: keep it off the event loop.
+    if truncate and await run_in_threadpool(db.truncate_tasks):
+        return None
+    job = await run_in_threadpool(register_job, PurgeJob(settings, batch_size=batch_size))
+    background_tasks.add_task(job.run)
+    return job.as_status()
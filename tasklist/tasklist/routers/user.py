@@ -1,12 +1,16 @@
 # pylint: disable=missing-module-docstring, missing-function-docstring, invalid-name
 import uuid
 
-from typing import Dict
+from typing import Dict, List, Optional
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
 
-from ..database import DBSession, get_db
-from ..models import User
+from ..database import DBSession, get_db, read_in_session, user_loader
+from ..jobs import PurgeJob, register_job
+from ..models import JobStatus, TaskStats, User
+from ..settings import Settings, get_settings
+from ..singleflight import reads
 
 router = APIRouter()
 
@@ -23,9 +27,25 @@ async def create_user(item: User, db: DBSession = Depends(get_db)):
 @router.delete(
     '/{owner_uuid}/delete',
     summary='Deletes user',
-    description='Deletes a user identified by its UUID',
+    description=(
+        'Deletes a user identified by its UUID. With purge_tasks, its tasks '
+        'are deleted in batches by a background job, which deletes the user '
+        'once they are gone, and the job status is returned.'
+    ),
+    response_model=Optional[JobStatus],
 )
-async def delete_user(owner_uuid: uuid.UUID, db: DBSession = Depends(get_db)):
+async def delete_user(
+        owner_uuid: uuid.UUID,
+        background_tasks: BackgroundTasks,
+        purge_tasks: bool = False,
+        batch_size: int = 10000,
+        db: DBSession = Depends(get_db),
+        settings: Settings = Depends(get_settings),
+):
+    if purge_tasks:
+        job = await run_in_threadpool(register_job, PurgeJob(settings, owner_uuid, batch_size))
+        background_tasks.add_task(job.run)
+        return job.as_status()
     try:
         db.delete_user(owner_uuid)
     except KeyError as exception:
@@ -59,11 +79,43 @@ async def alter_user(
     description='Reads user name from UUID.',
     response_model=User,
 )
-async def read_user(owner_uuid = uuid.UUID, db: DBSession = Depends(get_db)):
+async def read_user(owner_uuid: uuid.UUID):
+    try:
+        return await user_loader.load(owner_uuid)
+    except KeyError as exception:
+        raise HTTPException(
+            status_code=404,
+            detail='User not found',
+        ) from exception
+
+
+@router.get(
+    '/{owner_uuid}/stats',
+    summary='Reads user task statistics',
+    description='Reads how many tasks a user has, completed and open.',
+    response_model=TaskStats,
+)
+async def read_user_stats(owner_uuid: uuid.UUID, settings: Settings = Depends(get_settings)):
     try:
-        return db.read_user(owner_uuid)
+        return await reads.do(
+            ('read_stats', str(owner_uuid)),
+            read_in_session, settings, 'read_stats', owner_uuid,
+        )
     except KeyError as exception:
         raise HTTPException(
             status_code=404,
             detail='User not found',
-        ) from exception
\ No newline at end of file
+        ) from exception
+
+
+@router.post(
+    '/batch-get',
+    summary='Reads many users',
+    description=(
+        'Reads the users whose UUIDs are given, in a few queries. '
+        'Unknown UUIDs are left out of the result.'
+    ),
+    response_model=Dict[uuid.UUID, User],
+)
+async def read_users(owner_uuids: List[uuid.UUID], db: DBSession = Depends(get_db)):
+    return db.read_users(owner_uuids)
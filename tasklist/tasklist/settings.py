@@ -0,0 +1,120 @@
+# pylint: disable=missing-module-docstring, missing-function-docstring, missing-class-docstring
+import json
+import logging
+import os
+import signal
+import threading
+
+from typing import Dict, Optional
+
+from pydantic import BaseModel, ConfigDict  # pylint: disable=no-name-in-module
+
+from utils.utils import get_config_filename, get_app_secrets_filename
+
+ENV_PREFIX = 'TASKLIST_'
+
+logger = logging.getLogger(__name__)
+
+
+class ShardSettings(BaseModel):
+    db_host: str
+    database: str
+    weight: int = 1
+
+    model_config = ConfigDict(frozen=True)
+
+
+class Settings(BaseModel):
+    db_host: str
+    database: str
+    user: str
+    password: str
+    pool_size: int = 8
+    warmup_recent_owners: int = 0
+    boot_budget_seconds: Optional[float] = None
+    # Without shards everything lives in db_host/database. With shards,
+    # users and their tasks are spread over them by owner_uuid.
+    shards: Dict[str, ShardSettings] = {}
+    shard_vnodes: int = 64
+
+    model_config = ConfigDict(frozen=True)
+
+    @property
+    def credentials(self):
+        return {
+            'user': self.user,
+            'password': self.password,
+            'host': self.db_host,
+            'database': self.database,
+        }
+
+    @property
+    def shard_credentials(self):
+        if not self.shards:
+            return {'default': self.credentials}
+        return {
+            name: {**self.credentials, 'host': shard.db_host, 'database': shard.database}
+            for name, shard in sorted(self.shards.items())
+        }
+
+
+_settings: Optional[Settings] = None
+_sources = (None, None)
+
+
+def load_settings(config_file_name: str = None, secrets_file_name: str = None):
+    # Files first, then TASKLIST_<FIELD> environment variables on top.
+    if config_file_name is None:
+        config_file_name = os.environ.get(ENV_PREFIX + 'CONFIG', get_config_filename())
+    if secrets_file_name is None:
+        secrets_file_name = os.environ.get(ENV_PREFIX + 'SECRETS', get_app_secrets_filename())
+
+    with open(config_file_name, 'r') as file:
+        values = json.load(file)
+    with open(secrets_file_name, 'r') as file:
+        values.update(json.load(file))
+    for name in Settings.model_fields:
+        value = os.environ.get(ENV_PREFIX + name.upper())
+        if value is not None:
+            values[name] = json.loads(value) if name == 'shards' else value
+
+    return Settings(**values)
+
+
+def configure(config_file_name: str = None, secrets_file_name: str = None):
+    global _settings, _sources  # pylint: disable=global-statement
+    settings = load_settings(config_file_name, secrets_file_name)
+    _settings, _sources = settings, (config_file_name, secrets_file_name)
+    return settings
+
+
+def reload_settings():
+    # Requests already running keep the Settings object they were given;
+    # only the ones that start afterwards see the new one.
+    try:
+        return configure(*_sources)
+    except (OSError, ValueError) as exception:
+        logger.error('Keeping current settings, reload failed: %s', exception)
+        return _settings
+
+
+def install_reload_handler():
+    # Signal handlers can only be set from the main thread; servers that
+    # run startup elsewhere (TestClient's portal thread) go without reload.
+    if threading.current_thread() is not threading.main_thread():
+        logger.info('Not in the main thread, SIGHUP reload disabled')
+        return
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, lambda signum, frame: reload_settings())
+
+
+def current_settings() -> Settings:
+    if _settings is None:
+        configure()
+    return _settings
+
+
+async def get_settings() -> Settings:
+    # The request dependency. Being async, FastAPI calls it on the event
+    # loop instead of handing a thread pool slot to every request.
+    return current_settings()
@@ -0,0 +1,48 @@
+# pylint: disable=missing-module-docstring, missing-function-docstring, missing-class-docstring
+import bisect
+import hashlib
+import uuid
+
+from functools import lru_cache
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], 'big')
+
+
+class ShardRing:
+    # Consistent hashing: every shard owns vnodes * weight points of a ring
+    # and an owner goes to the first point after its own hash. Adding or
+    # removing a shard only moves the owners next to its points.
+    def __init__(self, weights: dict, vnodes: int = 64):
+        points = sorted(
+            (_hash(f'{name}#{i}'), name)
+            for name, weight in weights.items()
+            for i in range(vnodes * weight)
+        )
+        self._hashes = [point for point, _ in points]
+        self._names = [name for _, name in points]
+        # Tasks without an owner have nothing to be routed by.
+        self.default = min(weights)
+
+    def shard_for(self, owner_uuid) -> str:
+        if owner_uuid is None:
+            return self.default
+        # Hashes the canonical form: upper-case or unhyphenated spellings of
+        # the same UUID must land on the same shard. Raises ValueError for
+        # anything that is not a UUID.
+        key = str(uuid.UUID(str(owner_uuid)))
+        index = bisect.bisect(self._hashes, _hash(key))
+        return self._names[index % len(self._names)]
+
+
+@lru_cache(maxsize=8)
+def _ring(weights: tuple, vnodes: int):
+    return ShardRing(dict(weights), vnodes)
+
+
+def get_ring(settings) -> ShardRing:
+    if not settings.shards:
+        return _ring((('default', 1), ), 1)
+    weights = tuple(sorted((name, shard.weight) for name, shard in settings.shards.items()))
+    return _ring(weights, settings.shard_vnodes)
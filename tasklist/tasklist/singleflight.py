@@ -0,0 +1,93 @@
+# pylint: disable=missing-module-docstring, missing-function-docstring, missing-class-docstring
+import asyncio
+
+from typing import Dict, Hashable
+
+from starlette.concurrency import run_in_threadpool
+
+MAX_WAITERS = 100
+TIMEOUT_SECONDS = 5.0
+
+
+class _Flight:
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.waiters = 0
+
+
+def _retrieve_exception(future: asyncio.Future):
+    # Keeps asyncio from logging errors nobody else was waiting for.
+    if not future.cancelled():
+        future.exception()
+
+
+class SingleFlight:
+    # While a call for a key is running, later calls for the same key wait
+    # for its result instead of running their own. A waiter runs the call
+    # itself when max_waiters are already waiting or when the first call
+    # takes longer than timeout seconds. Results are shared between the
+    # requests, so they must be treated as read-only.
+    def __init__(self, max_waiters: int = MAX_WAITERS, timeout: float = TIMEOUT_SECONDS):
+        self.max_waiters = max_waiters
+        self.timeout = timeout
+        self.metrics = {
+            'executed': 0,
+            'coalesced': 0,
+            'overflowed': 0,
+            'timed_out': 0,
+        }
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    async def do(self, key: Hashable, function, *args):
+        flight = self._flights.get(key)
+        if flight is None:
+            return await self._lead(key, function, *args)
+
+        if flight.waiters >= self.max_waiters:
+            self.metrics['overflowed'] += 1
+            return await self._execute(function, *args)
+
+        flight.waiters += 1
+        try:
+            result = await asyncio.wait_for(asyncio.shield(flight.future), self.timeout)
+        except asyncio.TimeoutError:
+            self.metrics['timed_out'] += 1
+        except asyncio.CancelledError:
+            # The leader was cancelled, not us: run the call ourselves.
+            if not flight.future.cancelled():
+                raise
+        except Exception:
+            # The shared call failed; its error is our result too.
+            self.metrics['coalesced'] += 1
+            raise
+        else:
+            self.metrics['coalesced'] += 1
+            return result
+        finally:
+            flight.waiters -= 1
+        return await self._execute(function, *args)
+
+    async def _lead(self, key, function, *args):
+        future = asyncio.get_event_loop().create_future()
+        future.add_done_callback(_retrieve_exception)
+        self._flights[key] = _Flight(future)
+        try:
+            result = await self._execute(function, *args)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exception:
+            future.set_exception(exception)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._flights[key]
+
+    async def _execute(self, function, *args):
+        self.metrics['executed'] += 1
+        return await run_in_threadpool(function, *args)
+
+
+reads = SingleFlight()
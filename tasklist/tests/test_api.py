@@ -1,5 +1,7 @@
 # pylint: disable=missing-module-docstring,missing-function-docstring
+import gzip
 import os.path as path
+import time
 
 from fastapi.testclient import TestClient
 
@@ -10,24 +12,27 @@ sys.path.append(parentdir)
 
 from utils import utils
 
-from uuid import uuid4
+from uuid import UUID, uuid4
 
+from tasklist.database import DBSession
 from tasklist.main import app
+from tasklist.settings import configure, load_settings
+from tasklist.sharding import get_ring
 
 client = TestClient(app)
 
-app.dependency_overrides[utils.get_config_filename] = \
-    utils.get_config_test_filename
+configure(utils.get_config_test_filename())
 
 
-def setup_database():
+def setup_database(config_file_name=None):
     scripts_dir = path.join(
         path.dirname(__file__),
         '..',
         'database',
         'migrations',
     )
-    config_file_name = utils.get_config_test_filename()
+    if config_file_name is None:
+        config_file_name = utils.get_config_test_filename()
     secrets_file_name = utils.get_admin_secrets_filename()
     utils.run_all_scripts(scripts_dir, config_file_name, secrets_file_name)
 
@@ -295,3 +300,370 @@ def test_delete_all_tasks():
     response = client.get('/task')
     assert response.status_code == 200
     assert response.json() == {}
+
+
+def wait_for_job(job_uuid, timeout=10):
+    deadline = time.monotonic() + timeout
+    while True:
+        response = client.get(f'/job/{job_uuid}')
+        assert response.status_code == 200
+        job = response.json()
+        if job['status'] not in ('pending', 'running') or time.monotonic() > deadline:
+            return job
+        time.sleep(0.05)
+
+
+def test_delete_user_purging_tasks():
+    setup_database()
+
+    response = client.post('/user', json={'name': 'user-name1'})
+    assert response.status_code == 200
+    user_uuid = response.json()
+
+    for i in range(5):
+        task = {'description': f'task {i}', 'owner_uuid': user_uuid}
+        response = client.post('/task', json=task)
+        assert response.status_code == 200
+
+    # Purge in batches smaller than the number of tasks.
+    response = client.delete(
+        f'/user/{user_uuid}/delete?purge_tasks=true&batch_size=2'
+    )
+    assert response.status_code == 200
+    job = wait_for_job(response.json()['uuid'])
+    assert job['status'] == 'done'
+    assert job['processed'] == 5
+
+    # Neither the tasks nor orphans of them are left.
+    response = client.get('/task')
+    assert response.status_code == 200
+    assert response.json() == {}
+
+
+def test_stats_follow_an_unfinished_purge():
+    setup_database()
+
+    response = client.post('/user', json={'name': 'user-name1'})
+    assert response.status_code == 200
+    user_uuid = response.json()
+    for i in range(5):
+        task = {'description': f'task {i}', 'completed': i < 2, 'owner_uuid': user_uuid}
+        response = client.post('/task', json=task)
+        assert response.status_code == 200
+
+    # One chunk of a purge that then stops, as a cancelled job would.
+    connection = utils.connect(
+        utils.get_config_test_filename(), utils.get_app_secrets_filename(),
+    )
+    try:
+        assert len(DBSession(connection).purge_tasks_chunk(user_uuid, 3)) == 3
+    finally:
+        connection.close()
+
+    response = client.get(f'/user/{user_uuid}/stats')
+    assert response.json() == {'total': 2, 'completed': 0, 'open': 2}
+
+
+def test_cancel_nonexistant_job():
+    response = client.delete('/job/3668e9c9-df18-4ce2-9bb2-82f907cf110c')
+    assert response.status_code == 404
+
+
+def test_created_uuids_are_time_ordered():
+    setup_database()
+
+    response = client.post('/user', json={'name': 'user-name1'})
+    assert response.status_code == 200
+    user_uuid = response.json()
+
+    uuids = []
+    for i in range(3):
+        task = {'description': f'task {i}', 'owner_uuid': user_uuid}
+        response = client.post('/task', json=task)
+        assert response.status_code == 200
+        uuids.append(UUID(response.json()))
+        time.sleep(0.002)
+
+    assert UUID(user_uuid).version == 7
+    assert all(uuid_.version == 7 for uuid_ in uuids)
+    assert uuids == sorted(uuids)
+
+
+def test_recent_owners_follow_task_writes():
+    setup_database()
+
+    owners = []
+    for i in range(2):
+        response = client.post('/user', json={'name': f'user-name{i}'})
+        assert response.status_code == 200
+        owners.append(response.json())
+
+    response = client.post('/task', json={'description': 'old', 'owner_uuid': owners[0]})
+    assert response.status_code == 200
+    task_uuid = response.json()
+    time.sleep(0.01)
+    response = client.post('/task', json={'description': 'new', 'owner_uuid': owners[1]})
+    assert response.status_code == 200
+    time.sleep(0.01)
+    response = client.patch(
+        f'/task/{task_uuid}/user/{owners[0]}', json={'completed': True},
+    )
+    assert response.status_code == 200
+
+    connection = utils.connect(
+        utils.get_config_test_filename(), utils.get_app_secrets_filename(),
+    )
+    try:
+        assert DBSession(connection).read_recent_owners(2) == owners
+        assert DBSession(connection).read_recent_owners(1) == owners[:1]
+    finally:
+        connection.close()
+
+
+def test_ready_after_startup():
+    setup_database()
+
+    # The lifespan only runs when the client is used as a context manager.
+    # Warm-up runs beside the server, which is not ready until it is done.
+    with TestClient(app) as started_client:
+        deadline = time.monotonic() + 10
+        response = started_client.get('/health/ready')
+        while response.status_code == 503 and time.monotonic() < deadline:
+            time.sleep(0.05)
+            response = started_client.get('/health/ready')
+        assert response.status_code == 200
+        timings = response.json()
+        assert timings['boot_seconds'] >= timings['warm_up_seconds']
+
+
+def test_settings_environment_overrides_files(monkeypatch):
+    monkeypatch.setenv('TASKLIST_DB_HOST', 'db.example.com')
+    monkeypatch.setenv('TASKLIST_POOL_SIZE', '3')
+    settings = load_settings(utils.get_config_test_filename())
+    assert settings.db_host == 'db.example.com'
+    assert settings.pool_size == 3
+    assert settings.database == 'tasklist_test'
+
+
+def test_read_tasks_compressed_and_columnar():
+    setup_database()
+
+    response = client.post('/user', json={'name': 'user-name1'})
+    assert response.status_code == 200
+    user_uuid = response.json()
+
+    uuids = []
+    for i in range(50):
+        task = {'description': f'task {i}', 'completed': i % 2 == 0, 'owner_uuid': user_uuid}
+        response = client.post('/task', json=task)
+        assert response.status_code == 200
+        uuids.append(response.json())
+
+    # Large enough to be compressed; the client decompresses transparently.
+    response = client.get('/task', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['content-encoding'] == 'gzip'
+    assert 'Accept' in response.headers['vary']
+    assert len(response.json()) == 50
+
+    response = client.get(
+        f'/task/user/{user_uuid}',
+        headers={'Accept': 'application/vnd.tasklist.columnar+json'},
+    )
+    assert response.status_code == 200
+    assert 'Accept' in response.headers['vary']
+    columns = response.json()
+    assert sorted(columns['uuids']) == sorted(uuids)
+    assert len(columns['descriptions']) == 50
+    assert sum(columns['completed']) == 25
+
+    # Refused with q=0, or ranked below plain JSON: rows.
+    for accept in (
+            'application/vnd.tasklist.columnar+json;q=0, application/json',
+            'application/vnd.tasklist.columnar+json;q=0.5, application/json',
+    ):
+        response = client.get(f'/task/user/{user_uuid}', headers={'Accept': accept})
+        assert response.status_code == 200
+        assert len(response.json()) == 50
+
+
+def test_user_stats_follow_task_changes():
+    setup_database()
+
+    response = client.post('/user', json={'name': 'user-name1'})
+    assert response.status_code == 200
+    user_uuid = response.json()
+
+    uuids = []
+    for completed in [False, False, True]:
+        task = {'description': 'foo', 'completed': completed, 'owner_uuid': user_uuid}
+        response = client.post('/task', json=task)
+        assert response.status_code == 200
+        uuids.append(response.json())
+
+    response = client.get(f'/user/{user_uuid}/stats')
+    assert response.status_code == 200
+    assert response.json() == {'total': 3, 'completed': 1, 'open': 2}
+
+    # Complete one task and delete another.
+    response = client.patch(f'/task/{uuids[0]}/user/{user_uuid}', json={'completed': True})
+    assert response.status_code == 200
+    response = client.delete(f'/task/{uuids[2]}/user/{user_uuid}')
+    assert response.status_code == 200
+
+    response = client.get(f'/user/{user_uuid}/stats')
+    assert response.json() == {'total': 2, 'completed': 1, 'open': 1}
+
+    # Rebuilding the counters from the tasks table gives the same answer.
+    response = client.post('/job/reconcile-counters?batch_size=1')
+    assert response.status_code == 200
+    assert wait_for_job(response.json()['uuid'])['status'] == 'done'
+
+    response = client.get(f'/user/{user_uuid}/stats')
+    assert response.json() == {'total': 2, 'completed': 1, 'open': 1}
+
+
+def test_stats_of_nonexistant_user():
+    setup_database()
+    response = client.get('/user/3668e9c9-df18-4ce2-9bb2-82f907cf110c/stats')
+    assert response.status_code == 404
+
+
+def test_batch_get_users_and_tasks():
+    setup_database()
+
+    user_uuids = []
+    for i in range(3):
+        response = client.post('/user', json={'name': f'user-name{i}'})
+        assert response.status_code == 200
+        user_uuids.append(response.json())
+
+    task = {'description': 'foo', 'completed': False, 'owner_uuid': user_uuids[0]}
+    response = client.post('/task', json=task)
+    assert response.status_code == 200
+    task_uuid = response.json()
+
+    unknown_uuid = '3668e9c9-df18-4ce2-9bb2-82f907cf110c'
+    response = client.post('/user/batch-get', json=user_uuids + [unknown_uuid])
+    assert response.status_code == 200
+    assert response.json() == {
+        user_uuid: {'name': f'user-name{i}', 'owner_uuid': None}
+        for i, user_uuid in enumerate(user_uuids)
+    }
+
+    response = client.post('/task/batch-get', json=user_uuids[:2])
+    assert response.status_code == 200
+    assert response.json() == {
+        user_uuids[0]: {
+            task_uuid: {'description': 'foo', 'completed': False, 'owner_uuid': None},
+        },
+        user_uuids[1]: {},
+    }
+
+
+def test_export_and_import_tasks():
+    setup_database()
+
+    response = client.post('/user', json={'name': 'user-name1'})
+    assert response.status_code == 200
+    user_uuid = response.json()
+    for i in range(3):
+        task = {'description': f'task {i}', 'completed': i == 0, 'owner_uuid': user_uuid}
+        response = client.post('/task', json=task)
+        assert response.status_code == 200
+
+    response = client.get('/task')
+    tasks = response.json()
+
+    # The client decodes the gzip stream transparently.
+    response = client.get('/admin/export/users')
+    assert response.status_code == 200
+    users_ndjson = response.content
+    response = client.get('/admin/export/tasks?chunk_size=2')
+    assert response.status_code == 200
+    tasks_ndjson = response.content
+    assert len(tasks_ndjson.splitlines()) == 3
+
+    setup_database()
+    response = client.post('/admin/import/users', data=users_ndjson)
+    assert response.status_code == 200
+    assert response.json()['imported'] == 1
+    response = client.post(
+        '/admin/import/tasks?batch_size=2',
+        data=gzip.compress(tasks_ndjson),
+        headers={'Content-Encoding': 'gzip'},
+    )
+    assert response.status_code == 200
+    assert response.json()['imported'] == 3
+    assert wait_for_job(response.json()['job']['uuid'])['status'] == 'done'
+
+    response = client.get('/task')
+    assert response.json() == tasks
+    response = client.get(f'/user/{user_uuid}/stats')
+    assert response.json() == {'total': 3, 'completed': 1, 'open': 2}
+
+
+def test_import_stops_at_malformed_row():
+    setup_database()
+
+    rows = b''.join(
+        b'{"owner_uuid": "%s", "name": "user-name%d"}\n' % (str(uuid4()).encode(), i)
+        for i in range(3)
+    )
+    response = client.post('/admin/import/users?batch_size=2', data=rows + b'not json\n')
+    assert response.status_code == 400
+    assert response.json()['detail']['imported'] == 2
+
+    response = client.post(
+        '/admin/import/users', data=b'garbage', headers={'Content-Encoding': 'gzip'},
+    )
+    assert response.status_code == 400
+    assert response.json()['detail']['imported'] == 0
+
+
+def test_export_unknown_table():
+    response = client.get('/admin/export/secrets')
+    assert response.status_code == 404
+
+
+def test_sharded_routing_and_fan_out():
+    shards_config = path.join(path.dirname(__file__), '..', 'config', 'config_shards_test.json')
+    setup_database(shards_config)
+    settings = configure(shards_config)
+    try:
+        user_uuids = []
+        for i in range(12):
+            response = client.post('/user', json={'name': f'user-name{i}'})
+            assert response.status_code == 200
+            user_uuid = response.json()
+            user_uuids.append(user_uuid)
+            task = {'description': f'task {i}', 'completed': False, 'owner_uuid': user_uuid}
+            response = client.post('/task', json=task)
+            assert response.status_code == 200
+
+        # Every user and its task landed in the shard its UUID hashes to.
+        ring = get_ring(settings)
+        shards = {}
+        for user_uuid in user_uuids:
+            shards.setdefault(ring.shard_for(user_uuid), []).append(user_uuid)
+        assert len(shards) > 1
+        for name, owners in shards.items():
+            conn = utils.connect(shards_config, utils.get_app_secrets_filename(), name)
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT BIN_TO_UUID(owner_uuid) FROM tasks')
+                assert sorted(row[0] for row in cursor.fetchall()) == sorted(owners)
+            conn.close()
+
+        # Reads without an owner merge the results of every shard.
+        response = client.get('/task')
+        assert response.status_code == 200
+        assert len(response.json()) == 12
+
+        response = client.post('/user/batch-get', json=user_uuids)
+        assert response.status_code == 200
+        assert len(response.json()) == 12
+
+        response = client.get(f'/user/{user_uuids[0]}/stats')
+        assert response.json() == {'total': 1, 'completed': 0, 'open': 1}
+    finally:
+        configure(utils.get_config_test_filename())
@@ -0,0 +1,70 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring
+import os.path as path
+import sys
+
+from contextlib import contextmanager
+from unittest import mock
+
+currentdir = path.dirname(path.realpath(__file__))
+parentdir = path.dirname(currentdir)
+sys.path.append(parentdir)
+
+from tasklist import jobs
+from tasklist.settings import Settings
+
+SETTINGS = Settings(db_host='localhost', database='tasklist', user='user', password='password')
+
+
+class FakeJobsDB:
+    # Stands in for the jobs table every worker shares.
+    def __init__(self):
+        self.saved = []
+        self.cancel_requested = False
+
+    def update_job(self, job):
+        self.saved.append(job)
+        return self.cancel_requested
+
+
+class BrokenJob(jobs.Job):
+    def step(self, db):
+        raise RuntimeError('broken step')
+
+
+class CountingJob(jobs.Job):
+    def __init__(self, settings, jobs_db):
+        super().__init__(settings, batch_size=1)
+        self.jobs_db = jobs_db
+
+    def step(self, db):
+        if len(self.jobs_db.saved) == 3:
+            # Another worker asks the job to stop.
+            self.jobs_db.cancel_requested = True
+        return 1
+
+
+def run(job, jobs_db):
+    @contextmanager
+    def jobs_session(settings):
+        yield jobs_db
+
+    with mock.patch.object(jobs.conn, 'connect'), \
+            mock.patch.object(jobs, '_jobs_db', jobs_session):
+        job.run()
+
+
+def test_any_error_fails_the_job():
+    jobs_db = FakeJobsDB()
+    job = BrokenJob(SETTINGS)
+    run(job, jobs_db)
+    assert job.finished
+    assert jobs_db.saved[-1].status == 'failed'
+    assert jobs_db.saved[-1].error == 'broken step'
+
+
+def test_cancel_from_another_worker_stops_after_the_batch():
+    jobs_db = FakeJobsDB()
+    job = CountingJob(SETTINGS, jobs_db)
+    run(job, jobs_db)
+    assert [saved.status for saved in jobs_db.saved] == ['running'] * 4 + ['cancelled']
+    assert jobs_db.saved[-1].processed == 3
@@ -0,0 +1,98 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring
+import asyncio
+import os.path as path
+import sys
+import threading
+
+from uuid import uuid4
+
+import httpx
+import pytest
+
+currentdir = path.dirname(path.realpath(__file__))
+parentdir = path.dirname(currentdir)
+sys.path.append(parentdir)
+
+from tasklist.database import user_loader
+from tasklist.loader import DataLoader
+from tasklist.main import app
+from tasklist.models import User
+
+
+def test_loads_in_one_tick_share_one_batch():
+    calls = []
+
+    def batch_load(keys):
+        calls.append((keys, threading.current_thread()))
+        return {key: key.upper() for key in keys if key != 'missing'}
+
+    async def main():
+        loader = DataLoader(batch_load)
+        results = await asyncio.gather(
+            loader.load('a'),
+            loader.load('b'),
+            loader.load('a'),
+            loader.load_many(['b', 'c']),
+        )
+        with pytest.raises(KeyError):
+            await loader.load('missing')
+        return results
+
+    results = asyncio.run(main())
+    assert results == ['A', 'B', 'A', ['B', 'C']]
+    assert [keys for keys, _ in calls] == [['a', 'b', 'c'], ['missing']]
+    # The blocking batch_load stays off the event loop.
+    assert all(thread is not threading.main_thread() for _, thread in calls)
+
+
+def test_concurrent_user_requests_share_one_query(monkeypatch):
+    calls = []
+
+    def batch_load(keys):
+        calls.append(sorted(keys))
+        return {key: User(name=f'name-{key}') for key in keys}
+
+    monkeypatch.setattr(user_loader, 'batch_load', batch_load)
+    owner_uuids = [str(uuid4()) for _ in range(10)]
+
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            return await asyncio.gather(*(
+                client.get(f'/user/{owner_uuid}') for owner_uuid in owner_uuids * 2
+            ))
+
+    responses = asyncio.run(main())
+    assert [response.json()['name'] for response in responses] == [
+        f'name-{owner_uuid}' for owner_uuid in owner_uuids * 2
+    ]
+    assert calls == [sorted(owner_uuids)]
+
+
+def test_user_requests_accept_any_uuid_spelling(monkeypatch):
+    calls = []
+    owner_uuid = uuid4()
+
+    def batch_load(keys):
+        # Like read_users: results are keyed by the canonical form.
+        calls.append(keys)
+        return {str(owner_uuid): User(name='user-name')}
+
+    monkeypatch.setattr(user_loader, 'batch_load', batch_load)
+
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            return await asyncio.gather(
+                client.get(f'/user/{str(owner_uuid).upper()}'),
+                client.get(f'/user/{owner_uuid.hex}'),
+                client.get('/user/not-a-uuid'),
+            )
+
+    upper, unhyphenated, malformed = asyncio.run(main())
+    assert upper.status_code == 200
+    assert upper.json()['name'] == 'user-name'
+    assert unhyphenated.status_code == 200
+    # Rejected before it reaches the shared batch.
+    assert malformed.status_code == 422
+    assert calls == [[str(owner_uuid)]]
@@ -0,0 +1,30 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring
+import os.path as path
+import sys
+
+from uuid import uuid4
+
+import pytest
+
+currentdir = path.dirname(path.realpath(__file__))
+parentdir = path.dirname(currentdir)
+sys.path.append(parentdir)
+
+from tasklist.sharding import ShardRing
+
+
+def test_every_spelling_of_a_uuid_lands_on_the_same_shard():
+    ring = ShardRing({'shard0': 1, 'shard1': 1, 'shard2': 1})
+    for _ in range(200):
+        owner_uuid = uuid4()
+        shard = ring.shard_for(owner_uuid)
+        assert ring.shard_for(str(owner_uuid)) == shard
+        assert ring.shard_for(str(owner_uuid).upper()) == shard
+        assert ring.shard_for(owner_uuid.hex) == shard
+
+
+def test_malformed_owner_uuid_is_rejected():
+    ring = ShardRing({'shard0': 1, 'shard1': 1})
+    assert ring.shard_for(None) == 'shard0'
+    with pytest.raises(ValueError):
+        ring.shard_for('not-a-uuid')
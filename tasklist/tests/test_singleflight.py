@@ -0,0 +1,142 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring
+import asyncio
+import os.path as path
+import sys
+import threading
+import time
+
+from contextlib import contextmanager
+from uuid import uuid4
+
+import httpx
+
+currentdir = path.dirname(path.realpath(__file__))
+parentdir = path.dirname(currentdir)
+sys.path.append(parentdir)
+
+from tasklist import database
+from tasklist.main import app
+from tasklist.models import Task
+from tasklist.settings import Settings, get_settings
+from tasklist.singleflight import SingleFlight, reads
+
+
+class FakeDB:
+    def __init__(self, delay):
+        self.delay = delay
+        self.queries = 0
+        self.lock = threading.Lock()
+
+    def read_tasks(self, owner_uuid):
+        with self.lock:
+            self.queries += 1
+        time.sleep(self.delay)
+        return {'task': owner_uuid}
+
+
+def run_concurrently(flight, db, count, key='owner'):
+    async def main():
+        return await asyncio.gather(*(
+            flight.do(('read_tasks', key), db.read_tasks, key)
+            for _ in range(count)
+        ))
+    return asyncio.run(main())
+
+
+def test_identical_concurrent_reads_run_one_query():
+    flight = SingleFlight()
+    db = FakeDB(delay=0.1)
+
+    results = run_concurrently(flight, db, 50)
+
+    assert db.queries == 1
+    assert results == [{'task': 'owner'}] * 50
+    assert flight.metrics['executed'] == 1
+    assert flight.metrics['coalesced'] == 49
+
+
+def test_waiters_over_the_cap_run_their_own_query():
+    flight = SingleFlight(max_waiters=4)
+    db = FakeDB(delay=0.1)
+
+    results = run_concurrently(flight, db, 10)
+
+    assert results == [{'task': 'owner'}] * 10
+    assert db.queries == 6
+    assert flight.metrics['coalesced'] == 4
+    assert flight.metrics['overflowed'] == 5
+
+
+def test_waiters_fall_back_after_timeout():
+    flight = SingleFlight(timeout=0.05)
+    db = FakeDB(delay=0.2)
+
+    results = run_concurrently(flight, db, 3)
+
+    assert results == [{'task': 'owner'}] * 3
+    assert db.queries == 3
+    assert flight.metrics['timed_out'] == 2
+    assert flight.metrics['coalesced'] == 0
+    assert flight.metrics['executed'] == 3
+
+
+def test_errors_reach_every_waiter():
+    flight = SingleFlight()
+
+    def failing_read():
+        time.sleep(0.05)
+        raise KeyError()
+
+    async def main():
+        return await asyncio.gather(
+            *(flight.do('key', failing_read) for _ in range(5)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, KeyError) for result in results)
+    assert flight.metrics['executed'] == 1
+    assert flight.metrics['coalesced'] == 4
+
+
+class FakeTaskDB(FakeDB):
+    # Stands in for DBSession behind GET /task/user/{owner_uuid}.
+    def read_tasks(self, completed, owner_uuid):  # pylint: disable=arguments-differ
+        super().read_tasks(owner_uuid)
+        return {str(owner_uuid): Task(description='shared')}
+
+
+def test_identical_task_list_requests_run_one_query(monkeypatch):
+    db = FakeTaskDB(delay=0.1)
+    sessions = []
+
+    @contextmanager
+    def open_session(settings):
+        sessions.append(settings)
+        yield db
+
+    monkeypatch.setattr(database, 'open_session', open_session)
+    settings = Settings(db_host='localhost', database='tasklist', user='user', password='x')
+    app.dependency_overrides[get_settings] = lambda: settings
+    owner_uuid = str(uuid4())
+    executed = reads.metrics['executed']
+
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            return await asyncio.gather(*(
+                client.get(f'/task/user/{owner_uuid}') for _ in range(20)
+            ))
+
+    try:
+        responses = asyncio.run(main())
+    finally:
+        del app.dependency_overrides[get_settings]
+
+    assert all(response.status_code == 200 for response in responses)
+    task = {'description': 'shared', 'completed': False, 'owner_uuid': None}
+    assert all(response.json() == {owner_uuid: task} for response in responses)
+    assert db.queries == 1
+    # Only the request that ran the query took a connection.
+    assert len(sessions) == 1
+    assert reads.metrics['executed'] - executed == 1
@@ -0,0 +1,129 @@
+# pylint:disable=missing-module-docstring, missing-function-docstring, missing-class-docstring
+import json
+import zlib
+
+# Columns in export order. UUID columns travel as text and go through
+# BIN_TO_UUID/UUID_TO_BIN on the way out and in.
+TABLES = {
+    'users': {
+        'columns': ['owner_uuid', 'name'],
+        'uuid_columns': {'owner_uuid'},
+        'bool_columns': set(),
+        'key': 'owner_uuid',
+    },
+    'tasks': {
+        'columns': ['uuid', 'descricao', 'owner_uuid', 'completed'],
+        'uuid_columns': {'uuid', 'owner_uuid'},
+        'bool_columns': {'completed'},
+        'key': 'uuid',
+    },
+}
+
+CHUNK_SIZE = 5000
+
+
+def _select_query(table):
+    spec = TABLES[table]
+    columns = ', '.join(
+        f'BIN_TO_UUID({column})' if column in spec['uuid_columns'] else column
+        for column in spec['columns']
+    )
+    return f'SELECT {columns} FROM {table} ORDER BY {spec["key"]}'
+
+
+def _insert_query(table):
+    spec = TABLES[table]
+    values = ', '.join(
+        'UUID_TO_BIN(%s)' if column in spec['uuid_columns'] else '%s'
+        for column in spec['columns']
+    )
+    return f'INSERT INTO {table} ({", ".join(spec["columns"])}) VALUES ({values})'
+
+
+def gzip_chunks(chunks):
+    # One gzip stream over all chunks, flushed after each so it can be
+    # decoded as it arrives.
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for data in chunks:
+        yield compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def export_rows(connection, table, chunk_size=CHUNK_SIZE, compress=True):
+    # Yields the table as NDJSON, chunk_size rows at a time, optionally as
+    # one gzip stream. The cursor is unbuffered, so rows come from the
+    # server as they are fetched and memory stays flat.
+    chunks = _export_chunks(connection, table, chunk_size)
+    return gzip_chunks(chunks) if compress else chunks
+
+
+def _export_chunks(connection, table, chunk_size):
+    spec = TABLES[table]
+    with connection.cursor(buffered=False) as cursor:
+        cursor.execute(_select_query(table))
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield ''.join(
+                json.dumps({
+                    column: bool(value) if column in spec['bool_columns'] else value
+                    for column, value in zip(spec['columns'], row)
+                }) + '\n'
+                for row in rows
+            ).encode()
+
+
+class RowImporter:
+    # Takes NDJSON (optionally gzip-compressed) in arbitrary pieces through
+    # feed() and writes it with batched multi-row INSERTs, committing each
+    # batch. Only the current batch and a partial line are kept in memory.
+    def __init__(self, connection, table, batch_size=CHUNK_SIZE, compressed=True):
+        self.connection = connection
+        self.table = table
+        self.batch_size = batch_size
+        self.query = _insert_query(table)
+        self.columns = TABLES[table]['columns']
+        self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if compressed else None
+        self.buffer = b''
+        self.batch = []
+        self.imported = 0
+
+    def feed(self, data: bytes):
+        if self.decompressor is not None:
+            data = self.decompressor.decompress(data)
+        *lines, self.buffer = (self.buffer + data).split(b'\n')
+        for line in lines:
+            self._add_line(line)
+
+    def close(self):
+        if self.decompressor is not None:
+            self.buffer += self.decompressor.flush()
+        for line in self.buffer.split(b'\n'):
+            self._add_line(line)
+        self.buffer = b''
+        self._flush()
+        return self.imported
+
+    def _add_line(self, line: bytes):
+        if line.strip():
+            row = json.loads(line)
+            if not isinstance(row, dict):
+                raise ValueError(f'Expected a JSON object per line, got {line[:100]!r}')
+            self.add_row(row)
+
+    def add_row(self, row: dict):
+        self.batch.append(tuple(row.get(column) for column in self.columns))
+        if len(self.batch) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if not self.batch:
+            return
+        # Connector/Python rewrites executemany of an INSERT ... VALUES into
+        # a single multi-row INSERT.
+        with self.connection.cursor() as cursor:
+            cursor.executemany(self.query, self.batch)
+        self.connection.commit()
+        self.imported += len(self.batch)
+        self.batch = []
@@ -2,9 +2,25 @@
 import json
 import os
 import os.path
+import time
+import uuid
 
 import mysql.connector as cnt
 
+def uuid7():
+    # UUIDv7: 48-bit Unix timestamp in milliseconds followed by random bits.
+    # Stored as-is by UUID_TO_BIN, consecutive ids sort next to each other,
+    # so inserts append to the end of the clustered primary key instead of
+    # splitting random pages. Existing uuid4 ids keep the same binary layout
+    # and stay readable with plain BIN_TO_UUID.
+    timestamp_ms = time.time_ns() // 1_000_000
+    value = (timestamp_ms & 0xFFFF_FFFF_FFFF) << 80
+    value |= int.from_bytes(os.urandom(10), 'big')
+    value = (value & ~(0xF << 76)) | (0x7 << 76)  # version
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)  # variant
+    return uuid.UUID(int=value)
+
+
 def get_config_filename():
     return os.path.join(
         os.path.dirname(__file__),
@@ -41,29 +57,39 @@ def get_admin_secrets_filename():
     )
 
 
-def run_script(filename_script, filename_config, filename_secrets):
-    with open(filename_script, 'r') as file:
-        script = file.read()
+def connect(filename_config, filename_secrets, shard=None):
     with open(filename_config, 'r') as file:
         config = json.load(file)
     with open(filename_secrets, 'r') as file:
         secrets = json.load(file)
-    conn = cnt.connect(
+    if shard is not None:
+        config = config['shards'][shard]
+    return cnt.connect(
         host=config['db_host'],
         database=config['database'],
         user=secrets['user'],
         password=secrets['password'],
     )
-    with conn.cursor() as cursor:
-        # One has to iterate through the results to get them executed properly
-        # when using multi=True in this library. Makes sense after reflecting
-        # on it: each cursor has to be exhausted before emitting another
-        # command. Docs are not that clear, though:
-        # https://dev.mysql.com/doc/connector-python/en/connector-python-api-mysqlcursor-execute.html
-        for _ in cursor.execute(script, multi=True):
-            pass
-    conn.commit()
-    conn.close()
+
+
+def run_script(filename_script, filename_config, filename_secrets):
+    with open(filename_script, 'r') as file:
+        script = file.read()
+    with open(filename_config, 'r') as file:
+        config = json.load(file)
+    # A sharded service runs every migration on each of its shards too.
+    for shard in [None, *sorted(config.get('shards', {}))]:
+        conn = connect(filename_config, filename_secrets, shard)
+        with conn.cursor() as cursor:
+            # One has to iterate through the results to get them executed properly
+            # when using multi=True in this library. Makes sense after reflecting
+            # on it: each cursor has to be exhausted before emitting another
+            # command. Docs are not that clear, though:
+            # https://dev.mysql.com/doc/connector-python/en/connector-python-api-mysqlcursor-execute.html
+            for _ in cursor.execute(script, multi=True):
+                pass
+        conn.commit()
+        conn.close()
 
 
 def run_all_scripts(scripts_dir, filename_config, filename_secrets):